@@ -0,0 +1,269 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL,'
+    ' size INTEGER NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+    'CREATE TABLE IF NOT EXISTS stats ('
+    ' id INTEGER PRIMARY KEY CHECK (id = 1),'
+    ' entries INTEGER NOT NULL,'
+    ' size INTEGER NOT NULL)',
+    'INSERT OR IGNORE INTO stats VALUES (1, 0, 0)',
+    'CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN'
+    ' UPDATE stats SET entries = entries + 1, size = size + NEW.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN'
+    ' UPDATE stats SET entries = entries - 1, size = size - OLD.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache'
+    ' BEGIN UPDATE stats SET size = size - OLD.size + NEW.size; END',
+)
+
+UPSERT = (
+    'INSERT INTO cache (key, value, expires, accessed, size)'
+    ' VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET'
+    ' value = excluded.value, expires = excluded.expires,'
+    ' accessed = excluded.accessed, size = excluded.size'
+)
+
+# Ограничение SQLite на число параметров в одном запросе.
+MAX_VARIABLES = 999
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле SQLite в режиме WAL, общий для всех процессов хоста.
+
+    Читатели не блокируют писателя. Записи вытесняются по давности
+    последнего чтения (LRU), когда их больше MAX_ENTRIES или их общий
+    размер больше MAX_SIZE байт. Размер и количество записей ведут
+    триггеры, поэтому проверка лимитов не сканирует таблицу.
+    """
+
+    # Время последнего чтения обновляется не чаще раза в столько секунд,
+    # чтобы чтения не превращались в запись.
+    touch_interval = 1
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    def _connect(self):
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self._path, timeout=self._busy_timeout, isolation_level=None
+        )
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            connection.execute(statement)
+        return connection
+
+    @property
+    def _db(self):
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.connection = self._connect()
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    @contextmanager
+    def _transaction(self):
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _live(self, row, now):
+        expires = row[1]
+        return expires is None or expires > now
+
+    def _touch_accessed(self, keys, now):
+        # Чтение не ждёт писателя: на время обновления LRU ожидание
+        # блокировки отключено, занятый файл просто пропускается.
+        db = self._db
+        db.execute('PRAGMA busy_timeout = 0')
+        try:
+            with self._transaction():
+                db.executemany(
+                    'UPDATE cache SET accessed = ? WHERE key = ?',
+                    [(now, key) for key in keys],
+                )
+        except sqlite3.OperationalError:
+            # LRU обновится при следующем чтении.
+            pass
+        finally:
+            db.execute(
+                f'PRAGMA busy_timeout = {int(self._busy_timeout * 1000)}'
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._get_many([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys_map = {self._key(key, version): key for key in keys}
+        found = self._get_many(list(keys_map))
+        return {keys_map[key]: value for key, value in found.items()}
+
+    def _get_many(self, keys):
+        now = time.time()
+        result = {}
+        stale = []
+        for start in range(0, len(keys), MAX_VARIABLES):
+            chunk = keys[start:start + MAX_VARIABLES]
+            rows = self._db.execute(
+                'SELECT key, expires, accessed, value FROM cache'
+                f' WHERE key IN ({", ".join("?" * len(chunk))})',
+                chunk,
+            ).fetchall()
+            for key, expires, accessed, value in rows:
+                if expires is not None and expires <= now:
+                    continue
+                result[key] = pickle.loads(value)
+                if now - accessed > self.touch_interval:
+                    stale.append(key)
+        if stale:
+            self._touch_accessed(stale, now)
+        return result
+
+    def _row(self, key, value, timeout, now):
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        expires = self.get_backend_timeout(timeout)
+        return (key, blob, expires, now, len(key) + len(blob))
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        row = self._row(self._key(key, version), value, timeout, time.time())
+        self._db.execute(UPSERT, row)
+        self._cull_if_needed()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        rows = [
+            self._row(self._key(key, version), value, timeout, now)
+            for key, value in data.items()
+        ]
+        with self._transaction() as db:
+            db.executemany(UPSERT, rows)
+        self._cull_if_needed()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        row = self._row(self._key(key, version), value, timeout, now)
+        with self._transaction() as db:
+            db.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (row[0], now),
+            )
+            added = db.execute(
+                'INSERT INTO cache (key, value, expires, accessed, size)'
+                ' VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO NOTHING',
+                row,
+            ).rowcount
+        if added:
+            self._cull_if_needed()
+        return bool(added)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or not self._live(row, now):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            db.execute(
+                'UPDATE cache SET value = ?, size = ?, accessed = ?'
+                ' WHERE key = ?',
+                (blob, len(key) + len(blob), now, key),
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        return bool(
+            self._db.execute(
+                'UPDATE cache SET expires = ? WHERE key = ?'
+                ' AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, now),
+            ).rowcount
+        )
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ?'
+            ' AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._db.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        with self._transaction() as db:
+            db.executemany(
+                'DELETE FROM cache WHERE key = ?',
+                [(self._key(key, version),) for key in keys],
+            )
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def _over_limit(self, db):
+        entries, size = db.execute(
+            'SELECT entries, size FROM stats WHERE id = 1'
+        ).fetchone()
+        return entries > self._max_entries or size > self._max_size, entries
+
+    def _cull_if_needed(self):
+        over_limit, _ = self._over_limit(self._db)
+        if over_limit:
+            self._cull()
+
+    def _cull(self):
+        with self._transaction() as db:
+            db.execute(
+                'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+            )
+            over_limit, entries = self._over_limit(db)
+            if over_limit and self._cull_frequency == 0:
+                db.execute('DELETE FROM cache')
+                return
+            while over_limit and entries:
+                db.execute(
+                    'DELETE FROM cache WHERE key IN (SELECT key FROM cache'
+                    ' ORDER BY accessed LIMIT ?)',
+                    (max(entries // self._cull_frequency, 1),),
+                )
+                over_limit, entries = self._over_limit(db)
@@ -0,0 +1,26 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite с выбором режима начала транзакции.
+
+    OPTIONS['transaction_mode'] = 'IMMEDIATE' берёт блокировку записи
+    в начале atomic(). Отложенная транзакция, которая сначала читает,
+    а потом пишет, получает 'database is locked' сразу, не дожидаясь
+    busy_timeout, если за это время писал другой процесс.
+    """
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.transaction_mode = kwargs.pop('transaction_mode', 'DEFERRED')
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'transaction_mode должен быть одним из {TRANSACTION_MODES}'
+            )
+        return kwargs
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
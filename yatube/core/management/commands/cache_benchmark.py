@@ -0,0 +1,98 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'sqlite': 'core.cache_backends.sqlite.SQLiteCache',
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run_worker(backend, location, options):
+    """Чтение со сквозной записью при промахе и доля обычных записей."""
+    cache = import_string(backend)(
+        location, {'OPTIONS': {'MAX_ENTRIES': options['keys'] * 2}}
+    )
+    rng = random.Random(os.getpid())
+    value = 'x' * options['value_size']
+    gets, sets, hits = [], [], 0
+    started = time.perf_counter()
+    for _ in range(options['operations']):
+        key = f'key{rng.randrange(options["keys"])}'
+        if rng.random() < options['read_ratio']:
+            start = time.perf_counter()
+            found = cache.get(key)
+            gets.append(time.perf_counter() - start)
+            if found is not None:
+                hits += 1
+                continue
+        start = time.perf_counter()
+        cache.set(key, value)
+        sets.append(time.perf_counter() - start)
+    return gets, sets, hits, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает задержки get/set бэкендов кеша '
+        'при одновременной работе нескольких процессов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS
+        )
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument(
+            '--operations',
+            type=int,
+            default=2000,
+            help='Операций на процесс',
+        )
+        parser.add_argument('--keys', type=int, default=500)
+        parser.add_argument('--value-size', type=int, default=2048)
+        parser.add_argument('--read-ratio', type=float, default=0.9)
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        context = multiprocessing.get_context('spawn')
+        self.stdout.write(
+            f'{"backend":<8} {"ops/s":>9} {"get p50":>9} {"get p95":>9} '
+            f'{"set p50":>9} {"set p95":>9} {"hits":>6}'
+        )
+        try:
+            for name in options['backends']:
+                location = os.path.join(directory, f'{name}.sqlite3')
+                jobs = [(BACKENDS[name], location, options)] * options[
+                    'processes'
+                ]
+                with context.Pool(options['processes']) as pool:
+                    results = pool.starmap(run_worker, jobs)
+                elapsed = max(result[3] for result in results)
+                gets = [t for result in results for t in result[0]]
+                sets = [t for result in results for t in result[1]]
+                hits = sum(result[2] for result in results)
+                total = options['operations'] * options['processes']
+                self.stdout.write(
+                    f'{name:<8} {total / elapsed:>9.0f} '
+                    f'{percentile(gets, 0.5) * 1e6:>7.1f}us '
+                    f'{percentile(gets, 0.95) * 1e6:>7.1f}us '
+                    f'{percentile(sets, 0.5) * 1e6:>7.1f}us '
+                    f'{percentile(sets, 0.95) * 1e6:>7.1f}us '
+                    f'{hits / max(len(gets), 1):>6.0%}'
+                )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,57 @@
+import glob
+import io
+import os
+import pstats
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.middleware.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает профили запросов из PROFILE_DIR или самые дорогие '
+        'функции одного профиля'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile', nargs='?')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--sort', default='cumulative', choices=('cumulative', 'tottime')
+        )
+        parser.add_argument(
+            '--token',
+            action='store_true',
+            help='Напечатать токен для заголовка X-Profile',
+        )
+
+    def handle(self, *args, **options):
+        if options['token']:
+            self.stdout.write(make_token())
+        elif options['profile']:
+            self.show(options['profile'], options['sort'], options['limit'])
+        else:
+            self.list_profiles(options['limit'])
+
+    def list_profiles(self, limit):
+        paths = sorted(
+            glob.glob(os.path.join(settings.PROFILE_DIR, '*.prof')),
+            reverse=True,
+        )
+        for path in paths[:limit]:
+            stats = pstats.Stats(path)
+            self.stdout.write(
+                f'{os.path.basename(path)}  {stats.total_tt * 1e3:.1f}ms  '
+                f'{stats.total_calls} calls'
+            )
+
+    def show(self, name, sort, limit):
+        path = os.path.join(settings.PROFILE_DIR, os.path.basename(name))
+        if not os.path.exists(path):
+            raise CommandError(f'Нет профиля {name}')
+        output = io.StringIO()
+        stats = pstats.Stats(path, stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        self.stdout.write(output.getvalue())
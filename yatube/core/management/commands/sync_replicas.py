@@ -0,0 +1,43 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def copy_database(source, path):
+    """Копирует базу соединения source в файл SQLite path через backup
+    API: копия согласована и не останавливает запись в основную базу."""
+    source.ensure_connection()
+    target = sqlite3.connect(path, timeout=30)
+    try:
+        source.connection.backup(target)
+    finally:
+        target.close()
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в реплики из DATABASE_REPLICAS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Повторять каждые столько секунд',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('DATABASE_REPLICAS пуст')
+        source = connections[DEFAULT_DB_ALIAS]
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                started = time.perf_counter()
+                copy_database(source, connections[alias].settings_dict['NAME'])
+                self.stdout.write(
+                    f'{alias}: {(time.perf_counter() - started) * 1e3:.0f}ms'
+                )
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,279 @@
+import bisect
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+HEADER = struct.Struct('q')
+KEY_LENGTH = struct.Struct('i')
+VALUE = struct.Struct('d')
+INITIAL_SIZE = 64 * 1024
+FILE_PATTERN = 'metrics_*.db'
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _entries(data, used):
+    """Ключи, значения и смещения значений записей файла метрик."""
+    position = HEADER.size
+    while position < used:
+        (length,) = KEY_LENGTH.unpack_from(data, position)
+        key_start = position + KEY_LENGTH.size
+        key = bytes(data[key_start:key_start + length]).decode()
+        value_at = key_start + length + (-(KEY_LENGTH.size + length) % 8)
+        (value,) = VALUE.unpack_from(data, value_at)
+        yield key, value, value_at
+        position = value_at + VALUE.size
+
+
+class MmapValues:
+    """Значения метрик одного процесса в файле, отображённом в память.
+
+    Файл - занятый размер (8 байт) и записи: длина ключа, ключ,
+    дополненный до 8 байт, и значение double. Пишет только процесс
+    -владелец, остальные процессы только читают.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'a+b')
+        size = os.fstat(self._file.fileno()).st_size
+        if size == 0:
+            size = INITIAL_SIZE
+            self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        self._used = HEADER.unpack_from(self._mmap)[0] or HEADER.size
+        self._positions = {
+            key: value_at
+            for key, _, value_at in _entries(self._mmap, self._used)
+        }
+
+    def _grow(self, needed):
+        size = len(self._mmap)
+        while size < needed:
+            size *= 2
+        self._mmap.close()
+        self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+
+    def _append(self, key):
+        encoded = key.encode()
+        padding = -(KEY_LENGTH.size + len(encoded)) % 8
+        value_at = self._used + KEY_LENGTH.size + len(encoded) + padding
+        end = value_at + VALUE.size
+        if end > len(self._mmap):
+            self._grow(end)
+        KEY_LENGTH.pack_into(self._mmap, self._used, len(encoded))
+        key_start = self._used + KEY_LENGTH.size
+        self._mmap[key_start:key_start + len(encoded)] = encoded
+        VALUE.pack_into(self._mmap, value_at, 0.0)
+        # Размер пишется последним: читатель не увидит запись целиком,
+        # пока она не готова.
+        HEADER.pack_into(self._mmap, 0, end)
+        self._used = end
+        self._positions[key] = value_at
+        return value_at
+
+    def inc(self, key, amount):
+        value_at = self._positions.get(key)
+        if value_at is None:
+            value_at = self._append(key)
+        (value,) = VALUE.unpack_from(self._mmap, value_at)
+        VALUE.pack_into(self._mmap, value_at, value + amount)
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+
+def read_values(path):
+    """Ключи и значения из файла метрик любого процесса."""
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return {}
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            (used,) = HEADER.unpack_from(data)
+            return {key: value for key, value, _ in _entries(data, used)}
+
+
+def _sample_key(name, labels):
+    return json.dumps([name, labels], sort_keys=True)
+
+
+def _format_value(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        '{}="{}"'.format(
+            name,
+            str(value)
+            .replace('\\', r'\\')
+            .replace('\n', r'\n')
+            .replace('"', r'\"'),
+        )
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+class Counter:
+    """Счётчик, растущий только вверх."""
+
+    type = 'counter'
+
+    def __init__(self, registry, name, documentation, labelnames):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, amount=1, **labels):
+        self.registry.inc(_sample_key(self.name, labels), amount)
+
+    def samples(self, values):
+        for (name, labels), value in sorted(values.items()):
+            if name == self.name:
+                yield name, labels, value
+
+
+class Histogram:
+    """Гистограмма с фиксированными верхними границами корзин."""
+
+    type = 'histogram'
+
+    def __init__(
+        self, registry, name, documentation, labelnames,
+        buckets=DEFAULT_BUCKETS,
+    ):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        bound = self.buckets[bisect.bisect_left(self.buckets, value)]
+        bucket = {**labels, 'le': _format_bound(bound)}
+        self.registry.inc(_sample_key(self.name + '_bucket', bucket), 1)
+        self.registry.inc(_sample_key(self.name + '_sum', labels), value)
+        self.registry.inc(_sample_key(self.name + '_count', labels), 1)
+
+    def samples(self, values):
+        series = defaultdict(dict)
+        for (name, labels), value in values.items():
+            if name == self.name + '_bucket':
+                labels = dict(labels)
+                le = labels.pop('le')
+                series[tuple(sorted(labels.items()))][le] = value
+        for labels in sorted(series):
+            total = 0.0
+            for bound in self.buckets:
+                total += series[labels].get(_format_bound(bound), 0.0)
+                yield (
+                    self.name + '_bucket',
+                    (*labels, ('le', _format_bound(bound))),
+                    total,
+                )
+            for suffix in ('_sum', '_count'):
+                yield (
+                    self.name + suffix,
+                    labels,
+                    values.get((self.name + suffix, labels), 0.0),
+                )
+
+
+class Registry:
+    """Метрики, общие для всех процессов-воркеров.
+
+    Каждый процесс пишет в свой файл metrics_<pid>.db в METRICS_DIR,
+    а выгрузка суммирует файлы всех процессов, в том числе завершённых:
+    счётчики при перезапуске воркеров не откатываются.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._values = None
+        self._owner = None
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), **kwargs):
+        return self._register(
+            Histogram(self, name, documentation, labelnames, **kwargs)
+        )
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def _process_values(self):
+        # После fork или смены METRICS_DIR открывается свой файл.
+        owner = (os.getpid(), settings.METRICS_DIR)
+        if self._owner != owner:
+            if self._values is not None:
+                self._values.close()
+            os.makedirs(settings.METRICS_DIR, exist_ok=True)
+            path = os.path.join(
+                settings.METRICS_DIR, f'metrics_{os.getpid()}.db'
+            )
+            self._values = MmapValues(path)
+            self._owner = owner
+        return self._values
+
+    def inc(self, key, amount):
+        with self._lock:
+            self._process_values().inc(key, amount)
+
+    def collect(self):
+        """Значения всех процессов: {(имя, метки): сумма}."""
+        totals = defaultdict(float)
+        pattern = os.path.join(settings.METRICS_DIR, FILE_PATTERN)
+        for path in glob.glob(pattern):
+            for key, value in read_values(path).items():
+                name, labels = json.loads(key)
+                totals[name, tuple(sorted(labels.items()))] += value
+        return totals
+
+    def exposition(self):
+        """Метрики в текстовом формате Prometheus."""
+        values = self.collect()
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.samples(values):
+                lines.append(
+                    f'{name}{_format_labels(dict(labels))} '
+                    f'{_format_value(value)}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUESTS = registry.counter(
+    'yatube_requests_total',
+    'Запросы к представлениям.',
+    ('view', 'method', 'status'),
+)
+LATENCY = registry.histogram(
+    'yatube_request_duration_seconds',
+    'Время ответа представлений в секундах.',
+    ('view',),
+)
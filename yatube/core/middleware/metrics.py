@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.metrics import LATENCY, REQUESTS
+
+
+class MetricsMiddleware:
+    """Считает запросы и время ответа каждого представления.
+
+    При METRICS_ENABLED = False не подключается.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        REQUESTS.inc(
+            view=view, method=request.method, status=response.status_code
+        )
+        LATENCY.observe(elapsed, view=view)
+        return response
@@ -0,0 +1,102 @@
+import logging
+import os
+import random
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+IN_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+SPACES = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """Форма запроса: без значений, списков IN и лишних пробелов."""
+    sql = IN_LIST.sub('(%s, ...)', sql)
+    sql = LITERAL.sub('?', sql)
+    return SPACES.sub(' ', sql).strip()
+
+
+def query_origin():
+    """Шаблон и строка кода проекта, из которых выполняется запрос."""
+    template = code = None
+    frame = sys._getframe(2)
+    while frame is not None and not (template and code):
+        node = frame.f_locals.get('self')
+        if (
+            template is None
+            and frame.f_code.co_name == 'render_annotated'
+            and getattr(node, 'origin', None) is not None
+        ):
+            name = node.origin.template_name or node.origin.name
+            template = f'{name}:{node.token.lineno}'
+        filename = frame.f_code.co_filename
+        if (
+            code is None
+            and filename.startswith(settings.BASE_DIR)
+            and filename != __file__
+            and 'site-packages' not in filename
+        ):
+            path = os.path.relpath(filename, settings.BASE_DIR)
+            code = f'{path}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return template, code
+
+
+class QueryShapes:
+    """execute_wrapper, считающий запросы одной формы за запрос."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = normalize(sql)
+        self.counts[shape] += 1
+        if self.counts[shape] == self.threshold:
+            self.origins[shape] = query_origin()
+        return execute(sql, params, many, context)
+
+    def repeated(self):
+        for shape, origin in self.origins.items():
+            yield shape, self.counts[shape], origin
+
+
+class NPlusOneMiddleware:
+    """Ищет повторяющиеся запросы (N+1) в доле NPLUSONE_SAMPLE_RATE
+    запросов и пишет в лог представление, шаблон и строку кода.
+
+    Остальные запросы обслуживаются без накладных расходов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.NPLUSONE_SAMPLE_RATE
+        if not rate or random.random() >= rate:
+            return self.get_response(request)
+        shapes = QueryShapes(settings.NPLUSONE_THRESHOLD)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(shapes))
+            response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else request.path
+        for shape, count, (template, code) in shapes.repeated():
+            logger.warning(
+                'N+1 в %s: %d запросов вида %s (шаблон %s, код %s)',
+                view,
+                count,
+                shape,
+                template or '-',
+                code or '-',
+            )
+        return response
@@ -0,0 +1,51 @@
+import cProfile
+import os
+import time
+
+from django.conf import settings
+from django.core import signing
+
+SALT = 'core.profile'
+HEADER = 'HTTP_X_PROFILE'
+PARAM = '_profile'
+
+
+def make_token():
+    """Подписанный токен, включающий профилирование запроса."""
+    return signing.dumps('profile', salt=SALT)
+
+
+def token_valid(token):
+    try:
+        signing.loads(
+            token, salt=SALT, max_age=settings.PROFILE_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class ProfilingMiddleware:
+    """Профилирует запрос cProfile, если в заголовке X-Profile или
+    параметре _profile передан действующий токен make_token().
+
+    Профиль сохраняется в PROFILE_DIR под именем с временем и
+    представлением; его имя возвращается в заголовке X-Profile-File.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = request.META.get(HEADER) or request.GET.get(PARAM)
+        if not token or not token_valid(token):
+            return self.get_response(request)
+        profile = cProfile.Profile()
+        response = profile.runcall(self.get_response, request)
+        match = request.resolver_match
+        view = match.view_name.replace(':', '.') if match else 'unresolved'
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        name = f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{view}.prof'
+        profile.dump_stats(os.path.join(settings.PROFILE_DIR, name))
+        response['X-Profile-File'] = name
+        return response
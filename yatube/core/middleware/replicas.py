@@ -0,0 +1,38 @@
+from django.conf import settings
+
+from core.routers import PrimaryPin, pin_request, unpin_request
+
+COOKIE = 'primary_pin'
+SALT = 'core.replicas'
+
+
+class PrimaryPinMiddleware:
+    """Закрепляет пользователя за основной базой на REPLICA_PIN_SECONDS
+    после записи: пока реплики догоняют, он видит свои изменения."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = request.get_signed_cookie(
+            COOKIE,
+            default=None,
+            salt=SALT,
+            max_age=settings.REPLICA_PIN_SECONDS,
+        )
+        pin = PrimaryPin(pinned is not None)
+        token = pin_request(pin)
+        try:
+            response = self.get_response(request)
+        finally:
+            unpin_request(token)
+        if pin.wrote:
+            response.set_signed_cookie(
+                COOKIE,
+                '1',
+                salt=SALT,
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
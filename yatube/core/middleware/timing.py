@@ -0,0 +1,122 @@
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('server_timing', default=None)
+
+
+class Timings:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.rendering = False
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.total = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql += time.perf_counter() - started
+
+    def as_dict(self):
+        return {
+            'sql_queries': self.queries,
+            'sql_ms': round(self.sql * 1e3, 2),
+            'template_ms': round(self.template * 1e3, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'total_ms': round(self.total * 1e3, 2),
+        }
+
+    def header(self):
+        return ', '.join((
+            f'sql;dur={self.sql * 1e3:.2f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template * 1e3:.2f}',
+            f'cache;desc="hit={self.cache_hits} miss={self.cache_misses}"',
+            f'total;dur={self.total * 1e3:.2f}',
+        ))
+
+
+def cache_lookup(hits, misses):
+    """Учитывает попадания и промахи кеша в замерах текущего запроса."""
+    timings = _current.get()
+    if timings is not None:
+        timings.cache_hits += hits
+        timings.cache_misses += misses
+
+
+def _instrument_templates():
+    """Замеряет отрисовку шаблонов верхнего уровня; вложенные шаблоны
+    входят во время внешнего."""
+    render = Template._render
+    if getattr(render, 'timed', False):
+        return
+
+    def timed_render(self, context):
+        timings = _current.get()
+        if timings is None or timings.rendering:
+            return render(self, context)
+        timings.rendering = True
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            timings.rendering = False
+            timings.template += time.perf_counter() - started
+
+    timed_render.timed = True
+    Template._render = timed_render
+
+
+class ServerTimingMiddleware:
+    """Отдаёт замеры представлений из SERVER_TIMING_MODULES в заголовке
+    Server-Timing и пишет их в лог.
+
+    При SERVER_TIMING = False не подключается вовсе.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        _instrument_templates()
+
+    def __call__(self, request):
+        timings = Timings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            timings.total = time.perf_counter() - started
+            _current.reset(token)
+        match = request.resolver_match
+        if match and match.func.__module__ in settings.SERVER_TIMING_MODULES:
+            response['Server-Timing'] = timings.header()
+            values = timings.as_dict()
+            logger.info(
+                'view=%s status=%d %s',
+                match.view_name,
+                response.status_code,
+                ' '.join(f'{name}={value}' for name, value in values.items()),
+                extra={'view': match.view_name, **values},
+            )
+        return response
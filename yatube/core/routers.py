@@ -0,0 +1,80 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_pin = ContextVar('replica_pin', default=None)
+
+
+class PrimaryPin:
+    """Состояние запроса: читать ли с основной базы.
+
+    Запрос закрепляется за основной базой, если пришёл с cookie
+    закрепления или сам записал модели из REPLICA_PIN_APPS.
+    """
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def pin_request(pin):
+    """Делает pin состоянием текущего запроса; возвращает токен сброса."""
+    return _pin.set(pin)
+
+
+def unpin_request(token):
+    _pin.reset(token)
+
+
+def reads_primary_only():
+    """Закреплён ли запрос за основной базой, пока реплики догоняют.
+
+    Такой запрос не должен брать чужие кешированные страницы и
+    карточки: их могли отрисовать с отстающей реплики.
+    """
+    pin = _pin.get()
+    return bool(settings.DATABASE_REPLICAS) and pin is not None and pin.pinned
+
+
+class ReplicaRouter:
+    """Чтения запросов - с реплик из DATABASE_REPLICAS, записи и всё
+    остальное - в основную базу.
+
+    Вне запроса, внутри транзакции, для моделей PRIMARY_ONLY_APPS и после
+    записи чтение идёт с основной базы, чтобы пользователь сразу видел
+    свои изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        pin = _pin.get()
+        if (
+            not settings.DATABASE_REPLICAS
+            or pin is None
+            or pin.pinned
+            or model._meta.app_label in settings.PRIMARY_ONLY_APPS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        pin = _pin.get()
+        if pin is not None and model._meta.app_label in (
+            settings.REPLICA_PIN_APPS
+        ):
+            pin.pinned = pin.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплики - копии основной базы, их схему не трогают.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,104 @@
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from core.cache_backends.sqlite import SQLiteCache
+
+
+def _increment(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_basic_operations(self):
+        """Запись, чтение, add, incr и удаление."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertTrue(self.cache.add('new', 1))
+        self.assertEqual(self.cache.incr('new', 5), 6)
+        self.assertEqual(
+            self.cache.get_many(['key', 'new', 'missing']),
+            {'key': {'value': 1}, 'new': 6},
+        )
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_expired_entries_are_invisible(self):
+        """Просроченная запись не читается и может быть добавлена заново."""
+        self.cache.set('key', 'value', 0.05)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertFalse(self.cache.has_key('key'))
+        self.assertTrue(self.cache.add('key', 'fresh'))
+        self.assertEqual(self.cache.get('key'), 'fresh')
+
+    def test_least_recently_used_entries_are_culled(self):
+        """При переполнении вытесняются давно не читавшиеся записи."""
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=4)
+        cache.touch_interval = 0
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+            time.sleep(0.01)
+        cache.get('a')
+        cache.set('d', 'd')
+        self.assertEqual(sorted(cache.get_many('abcd')), ['a', 'c', 'd'])
+
+    def test_read_does_not_wait_for_writer(self):
+        """Чтение не ждёт писателя ради обновления LRU."""
+        self.cache.set('key', 'value')
+        self.cache.touch_interval = 0
+        writer = sqlite3.connect(self.location, isolation_level=None)
+        writer.execute('BEGIN IMMEDIATE')
+        try:
+            started = time.monotonic()
+            self.assertEqual(self.cache.get('key'), 'value')
+            self.assertLess(time.monotonic() - started, 1)
+        finally:
+            writer.execute('ROLLBACK')
+            writer.close()
+        self.cache.set('other', 'value')
+        self.assertEqual(self.cache.get('other'), 'value')
+
+    def test_size_limit(self):
+        """Общий размер записей не превышает MAX_SIZE."""
+        cache = self.make_cache(MAX_SIZE=10000)
+        for i in range(20):
+            cache.set(f'key{i}', 'x' * 1000)
+        size = cache._db.execute('SELECT size FROM stats').fetchone()[0]
+        self.assertLessEqual(size, 10000)
+        self.assertIsNotNone(cache.get('key19'))
+
+    def test_shared_between_processes(self):
+        """Процессы видят один кеш, incr атомарен между ними."""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('spawn')
+        workers = [
+            context.Process(target=_increment, args=(self.location, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
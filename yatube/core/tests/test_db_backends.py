@@ -0,0 +1,49 @@
+import os
+import shutil
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.db_backends.sqlite3.base import DatabaseWrapper
+
+
+class SQLiteTuningTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.path = os.path.join(directory, 'db.sqlite3')
+
+    def make_wrapper(self, **options):
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict, 'NAME': self.path, 'OPTIONS': options}
+        )
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234, 'cache_size': -8})
+    def test_pragmas_applied_on_connect(self):
+        """Каждое новое соединение получает SQLITE_PRAGMAS."""
+        with self.make_wrapper().cursor() as cursor:
+            for pragma, value in (('busy_timeout', 1234), ('cache_size', -8)):
+                with self.subTest(pragma=pragma):
+                    cursor.execute(f'PRAGMA {pragma}')
+                    self.assertEqual(cursor.fetchone()[0], value)
+
+    def test_transaction_mode(self):
+        """Транзакция начинается в режиме из OPTIONS."""
+        for mode in ('DEFERRED', 'IMMEDIATE'):
+            with self.subTest(mode=mode):
+                wrapper = self.make_wrapper(transaction_mode=mode)
+                with CaptureQueriesContext(wrapper) as queries:
+                    wrapper._start_transaction_under_autocommit()
+                wrapper.rollback()
+                self.assertEqual(queries[0]['sql'], f'BEGIN {mode}')
+
+    def test_unknown_mode(self):
+        """Неизвестный режим транзакций - ошибка настройки."""
+        wrapper = self.make_wrapper(transaction_mode='LAZY')
+        with self.assertRaises(ImproperlyConfigured):
+            wrapper.get_connection_params()
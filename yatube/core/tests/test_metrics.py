@@ -0,0 +1,93 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import MmapValues, Registry, read_values
+
+
+User = get_user_model()
+
+
+def _observe(registry, times):
+    counter, histogram = registry._metrics.values()
+    for _ in range(times):
+        counter.inc(view='posts:index')
+        histogram.observe(0.03, view='posts:index')
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        settings = override_settings(METRICS_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.registry = Registry()
+        self.registry.counter('hits_total', 'Попадания.', ('view',))
+        self.registry.histogram(
+            'latency_seconds', 'Время.', ('view',), buckets=(0.01, 0.1)
+        )
+
+    def test_mmap_values(self):
+        """Значения переживают переоткрытие и рост файла."""
+        path = os.path.join(self.directory, 'metrics_1.db')
+        values = MmapValues(path)
+        for i in range(5000):
+            values.inc(f'key{i}', i)
+        values.inc('key1', 2)
+        values.close()
+        self.assertEqual(read_values(path)['key1'], 3)
+        values = MmapValues(path)
+        values.inc('key4999', 1)
+        values.close()
+        data = read_values(path)
+        self.assertEqual(len(data), 5000)
+        self.assertEqual(data['key4999'], 5000)
+
+    def test_processes_aggregated(self):
+        """Выгрузка суммирует значения всех процессов."""
+        _observe(self.registry, 2)
+        process = multiprocessing.get_context('fork').Process(
+            target=_observe, args=(self.registry, 3)
+        )
+        process.start()
+        process.join()
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+        text = self.registry.exposition()
+        self.assertIn('# TYPE hits_total counter', text)
+        self.assertIn('hits_total{view="posts:index"} 5', text)
+        self.assertIn(
+            'latency_seconds_bucket{view="posts:index",le="0.01"} 0', text
+        )
+        self.assertIn(
+            'latency_seconds_bucket{view="posts:index",le="0.1"} 5', text
+        )
+        self.assertIn(
+            'latency_seconds_bucket{view="posts:index",le="+Inf"} 5', text
+        )
+        self.assertIn('latency_seconds_count{view="posts:index"} 5', text)
+
+    @override_settings(METRICS_ENABLED=True)
+    def test_endpoint(self):
+        """Запросы считаются, выгрузка доступна только персоналу."""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 302)
+        staff = User.objects.create_user(username='admin', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertContains(
+            response,
+            'yatube_requests_total{method="GET",status="200",'
+            'view="posts:index"}',
+        )
+        self.assertContains(
+            response, 'yatube_request_duration_seconds_count'
+        )
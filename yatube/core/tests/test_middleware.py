@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template import engines
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware import nplusone
+from core.middleware.nplusone import NPlusOneMiddleware, normalize
+from posts.models import Comment, Post
+
+
+User = get_user_model()
+
+
+class NPlusOneMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='Blogger')
+        post = Post.objects.create(text='Пост', author=author)
+        for i in range(6):
+            user = User.objects.create_user(username=f'Reader{i}')
+            Comment.objects.create(post=post, author=user, text='Текст')
+
+    def setUp(self):
+        template = engines['django'].from_string(
+            '{% for comment in comments %}\n'
+            '{{ comment.author.username }}\n'
+            '{% endfor %}'
+        )
+
+        def view(request):
+            return HttpResponse(
+                template.render({'comments': Comment.objects.all()})
+            )
+
+        self.middleware = NPlusOneMiddleware(view)
+        self.request = RequestFactory().get('/comments/')
+        self.request.resolver_match = None
+
+    def test_normalize(self):
+        """Значения и списки IN не влияют на форму запроса."""
+        self.assertEqual(
+            normalize('SELECT  * FROM t WHERE id IN (%s, %s) LIMIT 21'),
+            normalize('SELECT * FROM t WHERE id IN (%s, %s, %s) LIMIT 1'),
+        )
+
+    @override_settings(NPLUSONE_SAMPLE_RATE=1.0, NPLUSONE_THRESHOLD=5)
+    def test_repeated_queries_logged(self):
+        """Повторяющийся запрос пишется в лог с местом в шаблоне."""
+        with self.assertLogs('core.middleware.nplusone', 'WARNING') as logs:
+            self.middleware(self.request)
+        (message,) = logs.output
+        self.assertIn('/comments/: 6 запросов', message)
+        self.assertIn('FROM "auth_user"', message)
+        self.assertIn(':2', message)
+
+    @override_settings(NPLUSONE_SAMPLE_RATE=0.0)
+    def test_disabled_by_default(self):
+        """Без выборки запросы не проверяются."""
+        with mock.patch.object(nplusone.logger, 'warning') as warning:
+            self.middleware(self.request)
+        warning.assert_not_called()
+
+
+class ServerTimingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='Blogger')
+        Post.objects.create(text='Пост', author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(SERVER_TIMING=True)
+    def test_posts_views_timed(self):
+        """Представления posts отдают Server-Timing и пишут замеры в лог."""
+        with self.assertLogs('core.middleware.timing', 'INFO') as logs:
+            response = self.client.get(reverse('posts:index'))
+        header = response['Server-Timing']
+        for metric in ('sql;dur=', 'tpl;dur=', 'cache;desc=', 'total;dur='):
+            self.assertIn(metric, header)
+        self.assertIn('miss=', header)
+        (record,) = logs.records
+        self.assertEqual(record.view, 'posts:index')
+        self.assertGreater(record.sql_queries, 0)
+        self.assertGreater(record.template_ms, 0)
+
+    @override_settings(SERVER_TIMING=True)
+    def test_other_views_not_timed(self):
+        """Остальные представления заголовок не получают."""
+        response = self.client.get(reverse('about:author'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(SERVER_TIMING=False)
+    def test_disabled(self):
+        """Выключенные замеры не добавляют заголовок."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
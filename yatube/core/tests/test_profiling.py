@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core import signing
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware.profiling import SALT, make_token
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        settings = override_settings(PROFILE_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, self.directory, True)
+
+    def test_signed_header_profiles_request(self):
+        """Запрос с токеном профилируется, профиль виден команде."""
+        response = self.client.get(
+            reverse('posts:index'), HTTP_X_PROFILE=make_token()
+        )
+        name = response['X-Profile-File']
+        self.assertTrue(name.endswith('-posts.index.prof'))
+        self.assertEqual(os.listdir(self.directory), [name])
+        output = StringIO()
+        call_command('profiles', stdout=output)
+        self.assertIn(name, output.getvalue())
+        output = StringIO()
+        call_command('profiles', name, limit=5, stdout=output)
+        self.assertIn('function calls', output.getvalue())
+
+    def test_query_parameter(self):
+        """Токен можно передать параметром _profile."""
+        response = self.client.get(
+            reverse('posts:index'), {'_profile': make_token()}
+        )
+        self.assertTrue(response.has_header('X-Profile-File'))
+
+    def test_invalid_token_ignored(self):
+        """Без действующего токена запрос не профилируется."""
+        forged = signing.dumps('profile', salt=SALT, key='other')
+        for token in ('', 'profile', forged):
+            response = self.client.get(
+                reverse('posts:index'), HTTP_X_PROFILE=token
+            )
+            self.assertFalse(response.has_header('X-Profile-File'))
+        self.assertEqual(os.listdir(self.directory), [])
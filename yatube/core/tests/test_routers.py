@@ -0,0 +1,119 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+
+from core.management.commands.sync_replicas import copy_database
+from core.middleware.replicas import COOKIE, PrimaryPinMiddleware
+from core.routers import PrimaryPin, ReplicaRouter, pin_request, unpin_request
+from core.writer import run_write
+from posts.models import Group, Post
+
+
+def create_group(slug='group'):
+    return Group.objects.create(title=slug, slug=slug, description='-')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.pin = PrimaryPin()
+        self.addCleanup(unpin_request, pin_request(self.pin))
+
+    def test_reads_from_replica(self):
+        """Чтения запроса идут с реплики, записи - в основную базу."""
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_write_pins_primary(self):
+        """После записи постов запрос читает с основной базы."""
+        self.router.db_for_write(Post)
+        self.assertTrue(self.pin.wrote)
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    @override_settings(REPLICA_PIN_APPS=('auth',))
+    def test_other_apps_do_not_pin(self):
+        """Записи других приложений не закрепляют пользователя."""
+        self.router.db_for_write(Post)
+        self.assertFalse(self.pin.wrote)
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+
+    def test_primary_only_apps(self):
+        """Сессии всегда читаются с основной базы."""
+        self.assertEqual(self.router.db_for_read(Session), 'default')
+
+    def test_outside_request(self):
+        """Вне запроса всё читается с основной базы."""
+        token = pin_request(None)
+        self.addCleanup(unpin_request, token)
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_replicas_not_migrated(self):
+        """Схему реплик не мигрируют: это копии основной базы."""
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class PrimaryPinMiddlewareTests(TransactionTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def call(self, view, cookies=None):
+        request = self.factory.get('/')
+        request.COOKIES.update(cookies or {})
+        return PrimaryPinMiddleware(view)(request)
+
+    def read_database(self, request):
+        return HttpResponse(self.router.db_for_read(Post))
+
+    def test_cookie_pins_next_requests(self):
+        """Записавший получает cookie и следующие запросы читает с основной
+        базы."""
+        response = self.call(lambda request: create_group() and HttpResponse())
+        self.assertIn(COOKIE, response.cookies)
+        self.assertEqual(self.call(self.read_database).content, b'replica')
+        pinned = {COOKIE: response.cookies[COOKIE].value}
+        self.assertEqual(
+            self.call(self.read_database, pinned).content, b'default'
+        )
+        forged = {COOKIE: '1'}
+        self.assertEqual(
+            self.call(self.read_database, forged).content, b'replica'
+        )
+
+    @override_settings(WRITE_QUEUE_ENABLED=True)
+    def test_queued_write_pins(self):
+        """Запись через поток-писатель тоже закрепляет пользователя."""
+        response = self.call(
+            lambda request: run_write(create_group) and HttpResponse()
+        )
+        self.assertIn(COOKIE, response.cookies)
+
+
+class SyncReplicasTests(TransactionTestCase):
+    def test_copy_database(self):
+        """Реплика получает согласованную копию основной базы."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        path = os.path.join(directory, 'replica.sqlite3')
+        create_group('copied')
+        copy_database(connection, path)
+        replica = sqlite3.connect(path)
+        self.addCleanup(replica.close)
+        self.assertEqual(
+            replica.execute('SELECT slug FROM posts_group').fetchall(),
+            [('copied',)],
+        )
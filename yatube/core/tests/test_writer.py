@@ -0,0 +1,58 @@
+import threading
+
+from django.test import TransactionTestCase, override_settings
+
+from core.writer import WriteQueue, run_write
+from posts.models import Group
+
+
+def create_group(slug):
+    return Group.objects.create(title=slug, slug=slug, description='-')
+
+
+class WriteQueueTests(TransactionTestCase):
+    def setUp(self):
+        self.queue = WriteQueue(batch_size=10)
+
+    def test_pending_writes_batched(self):
+        """Записи, накопившиеся за время пачки, фиксируются вместе."""
+        started, release = threading.Event(), threading.Event()
+
+        def blocking():
+            started.set()
+            release.wait(5)
+
+        first = self.queue.submit(blocking)
+        started.wait(5)
+        futures = [
+            self.queue.submit(create_group, f'slug-{i}') for i in range(5)
+        ]
+        release.set()
+        first.result(5)
+        groups = [future.result(5) for future in futures]
+        self.assertEqual(self.queue.batches, 2)
+        self.assertEqual(self.queue.operations, 6)
+        self.assertEqual(
+            [group.slug for group in groups],
+            [f'slug-{i}' for i in range(5)],
+        )
+        self.assertEqual(Group.objects.count(), 5)
+
+    def test_failure_isolated(self):
+        """Ошибка одной записи не откатывает остальные записи пачки."""
+        started, release = threading.Event(), threading.Event()
+        self.queue.submit(lambda: started.set() or release.wait(5))
+        started.wait(5)
+        good = self.queue.submit(create_group, 'unique')
+        duplicate = self.queue.submit(create_group, 'unique')
+        release.set()
+        good.result(5)
+        with self.assertRaises(Exception):
+            duplicate.result(5)
+        self.assertEqual(Group.objects.filter(slug='unique').count(), 1)
+
+    @override_settings(WRITE_QUEUE_ENABLED=True)
+    def test_run_write(self):
+        """run_write ждёт фиксации записи потоком-писателем."""
+        group = run_write(create_group, 'queued')
+        self.assertTrue(Group.objects.filter(pk=group.pk).exists())
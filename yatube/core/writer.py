@@ -0,0 +1,105 @@
+import contextvars
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+
+class WriteQueue:
+    """Поток-писатель, выполняющий записи пачками.
+
+    Всё, что накопилось в очереди, пока шла предыдущая пачка,
+    выполняется в одной транзакции, каждая операция - в своей точке
+    сохранения: ошибка одной не откатывает остальные. Результаты
+    отдаются только после фиксации.
+    """
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.batches = 0
+        self.operations = 0
+        self.pid = os.getpid()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name='db-writer', daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """Ставит запись в очередь; она выполнится в контексте
+        вызывающего (contextvars), как если бы шла в его потоке."""
+        future = Future()
+        context = contextvars.copy_context()
+        self._queue.put((future, context, func, args, kwargs))
+        return future
+
+    def _take_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            self._execute(batch)
+            self.batches += 1
+            self.operations += len(batch)
+
+    def _execute(self, batch):
+        outcomes = []
+        try:
+            close_old_connections()
+            with transaction.atomic():
+                for _, context, func, args, kwargs in batch:
+                    try:
+                        with transaction.atomic():
+                            result = context.run(func, *args, **kwargs)
+                        outcomes.append((result, None))
+                    except Exception as error:
+                        outcomes.append((None, error))
+        except Exception as error:
+            for future, *_ in batch:
+                future.set_exception(error)
+            return
+        for (future, *_), (result, error) in zip(batch, outcomes):
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def writer():
+    """Поток-писатель текущего процесса; после fork создаётся заново."""
+    global _writer
+    with _writer_lock:
+        if _writer is None or _writer.pid != os.getpid():
+            _writer = WriteQueue(settings.WRITE_QUEUE_BATCH_SIZE)
+        return _writer
+
+
+def run_write(func, *args, **kwargs):
+    """Выполняет запись func(*args, **kwargs) и возвращает её результат.
+
+    При WRITE_QUEUE_ENABLED запись уходит потоку-писателю, а запрос ждёт
+    её фиксации; иначе, как и внутри уже открытой транзакции,
+    выполняется сразу в своём atomic().
+    """
+    if (
+        not settings.WRITE_QUEUE_ENABLED
+        or transaction.get_connection().in_atomic_block
+    ):
+        with transaction.atomic():
+            return func(*args, **kwargs)
+    future = writer().submit(func, *args, **kwargs)
+    return future.result(settings.WRITE_QUEUE_TIMEOUT)
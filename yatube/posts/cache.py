@@ -0,0 +1,317 @@
+import hashlib
+import math
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.cache import get_cache_key, learn_cache_key
+from django.views.decorators.http import condition
+
+from core.middleware.timing import cache_lookup
+from core.routers import reads_primary_only
+
+TAG_PREFIX = 'tag:'
+CARD_PREFIX = 'card:'
+CARD_TEMPLATE = 'includes/article.html'
+STATS_PREFIX = 'stampede:'
+STATS = (
+    'recomputes',
+    'early_recomputes',
+    'stale_served',
+    'waited',
+    'wait_timeouts',
+)
+
+# Запись страницы хранится в STALE_FACTOR раз дольше своего срока, чтобы
+# было что отдать, пока её пересчитывает другой запрос.
+STALE_FACTOR = 2
+# Насколько заранее пересчитывать страницу, в долях времени её расчёта.
+EARLY_BETA = 1.0
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 2
+LOCK_POLL = 0.05
+
+
+def index_tag():
+    return 'index'
+
+
+def group_tag(slug):
+    return f'group:{slug}'
+
+
+def author_tag(username):
+    return f'author:{username}'
+
+
+def author_name_tag(username):
+    """Имя автора на карточках: в отличие от author_tag, не меняется
+    с каждым постом и подпиской."""
+    return f'author-name:{username}'
+
+
+def post_tag(post_id):
+    return f'post:{post_id}'
+
+
+def _tag_key(tag):
+    return TAG_PREFIX + hashlib.md5(tag.encode()).hexdigest()
+
+
+def _now():
+    return int(time.time() * 1000000)
+
+
+def tag_versions(tags):
+    """Версии тегов - время их последнего изменения в микросекундах.
+
+    Тег, которого нет в кеше, считается изменённым только что.
+    """
+    keys = [_tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = {key: _now() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def _request_versions(request, tags, args, kwargs):
+    """Версии тегов страницы, запомненные на время запроса: их читают
+    и валидаторы, и кеш страницы."""
+    memo = request.__dict__.setdefault('_tag_versions', {})
+    key = (tags, args, tuple(sorted(kwargs.items())))
+    if key not in memo:
+        memo[key] = tag_versions(tags(request, *args, **kwargs))
+    return memo[key]
+
+
+def _bump(tags):
+    now = _now()
+    cache.set_many({_tag_key(tag): now for tag in tags}, None)
+
+
+def invalidate(*tags):
+    """Сбрасывает всё, что закешировано с этими тегами.
+
+    Версии меняются сразу и ещё раз после фиксации транзакции: запрос,
+    прочитавший базу до фиксации, мог сохранить старые данные под
+    промежуточной версией.
+    """
+    _bump(tags)
+    transaction.on_commit(lambda: _bump(tags))
+
+
+def _count(name):
+    key = STATS_PREFIX + name
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def stampede_stats():
+    """Счётчики пересчётов страниц, общие для всех процессов."""
+    values = cache.get_many([STATS_PREFIX + name for name in STATS])
+    stats = {name: values.get(STATS_PREFIX + name, 0) for name in STATS}
+    stats['duplicates_avoided'] = stats['stale_served'] + stats['waited']
+    return stats
+
+
+def _should_refresh(entry, now):
+    """Вероятностный досрочный пересчёт (XFetch): чем ближе срок и чем
+    дольше считается страница, тем вероятнее пересчитать её заранее."""
+    jitter = -math.log(1 - random.random())
+    return now + entry['delta'] * EARLY_BETA * jitter >= entry['expires']
+
+
+def _wait_for(lookup):
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL)
+        entry = lookup()
+        if entry is not None:
+            return entry
+    return None
+
+
+def _while_locked(lookup, entry):
+    """Запись, которую можно отдать, пока страницу пересчитывает другой
+    запрос, или None, если не дождались."""
+    if entry is not None:
+        _count('stale_served')
+        return entry
+    entry = _wait_for(lookup)
+    _count('waited' if entry is not None else 'wait_timeouts')
+    return entry
+
+
+def _store(request, response, key_prefix, timeout, delta):
+    if (
+        response.status_code != 200
+        or response.streaming
+        or response.cookies
+    ):
+        return
+    stored_for = timeout * STALE_FACTOR
+    entry = {
+        'response': response,
+        'expires': time.time() + timeout,
+        'delta': delta,
+    }
+    cache_key = learn_cache_key(
+        request, response, stored_for, key_prefix, cache
+    )
+    cache.set(cache_key, entry, stored_for)
+
+
+def conditional_tagged(tags):
+    """Отвечает 304 Not Modified, если теги страницы не менялись.
+
+    Валидатор - только ETag, хеш версий тегов, пользователя и
+    CSRF-токена:
+    Last-Modified общий для всех пользователей и точен до секунды.
+    Представление при совпадении не вызывается. Запросу, закреплённому
+    за основной базой, 304 не отдаётся.
+    """
+    def etag(request, *args, **kwargs):
+        versions = _request_versions(request, tags, args, kwargs)
+        # Формы страницы несут CSRF-токен: вход его меняет.
+        csrf = request.META.get('CSRF_COOKIE')
+        return hashlib.md5(
+            repr((versions, request.user.pk, csrf)).encode()
+        ).hexdigest()
+
+    def decorator(view):
+        conditional = condition(etag_func=etag)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            # Версия тега уже новая, а реплика могла отдать старые данные.
+            if reads_primary_only():
+                return view(request, *args, **kwargs)
+            return conditional(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def cache_tagged(timeout, tags):
+    """Кеширует страницу, пока не изменится ни один из её тегов.
+
+    tags(request, *args, **kwargs) возвращает теги страницы; их версии
+    и пользователь входят в ключ, поэтому invalidate() вытесняет только
+    эти страницы.
+    Страницу пересчитывает один запрос: остальные получают устаревшую
+    копию или ждут его результата. Условные запросы обрабатывает
+    conditional_tagged(). Запрос, закреплённый за основной базой после
+    записи, кеш не читает и не пополняет.
+    """
+    def decorator(view):
+        def render(request, key_prefix, *args, **kwargs):
+            cache_lookup(0, 1)
+            started = time.perf_counter()
+            response = view(request, *args, **kwargs)
+            _store(
+                request,
+                response,
+                key_prefix,
+                timeout,
+                time.perf_counter() - started,
+            )
+            return response
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or reads_primary_only():
+                return view(request, *args, **kwargs)
+            versions = _request_versions(request, tags, args, kwargs)
+            # Шапка и кнопки страницы зависят от пользователя.
+            key_prefix = 'tagged.' + hashlib.md5(
+                repr((versions, request.user.pk)).encode()
+            ).hexdigest()
+
+            def lookup():
+                cache_key = get_cache_key(request, key_prefix, 'GET', cache)
+                return None if cache_key is None else cache.get(cache_key)
+
+            entry = lookup()
+            if entry is not None and not _should_refresh(entry, time.time()):
+                cache_lookup(1, 0)
+                return entry['response']
+            # Ключ блокировки известен и до того, как страница с новой
+            # версией тегов впервые сохранена: после invalidate()
+            # пересчитывает тоже один запрос.
+            lock_key = key_prefix + '.lock.' + hashlib.md5(
+                request.build_absolute_uri().encode()
+            ).hexdigest()
+            if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+                entry = _while_locked(lookup, entry)
+                if entry is not None:
+                    cache_lookup(1, 0)
+                    return entry['response']
+                return render(request, key_prefix, *args, **kwargs)
+            early = entry is not None and time.time() < entry['expires']
+            _count('early_recomputes' if early else 'recomputes')
+            try:
+                return render(request, key_prefix, *args, **kwargs)
+            finally:
+                cache.delete(lock_key)
+
+        return conditional_tagged(tags)(wrapper)
+
+    return decorator
+
+
+def _card_tags(post, show_group_link):
+    tags = [post_tag(post.pk), author_name_tag(post.author.username)]
+    if show_group_link and post.group_id:
+        tags.append(group_tag(post.group.slug))
+    return tags
+
+
+def _render_card(post, show_group_link):
+    return render_to_string(
+        CARD_TEMPLATE, {'post': post, 'show_group_link': show_group_link}
+    )
+
+
+def post_cards(posts, show_group_link):
+    """Отрисованные карточки постов в порядке posts.
+
+    Карточки всей страницы читаются одним get_many. Ключ включает
+    версии тегов поста, его автора и группы, поэтому правка или удаление
+    поста вытесняет его карточку сразу во всех лентах. Запрос,
+    закреплённый за основной базой, кешем не пользуется.
+    """
+    posts = list(posts)
+    if reads_primary_only():
+        return [_render_card(post, show_group_link) for post in posts]
+    tags = [_card_tags(post, show_group_link) for post in posts]
+    unique = list({tag for post_tags in tags for tag in post_tags})
+    versions = dict(zip(unique, tag_versions(unique)))
+    keys = []
+    for post, post_tags in zip(posts, tags):
+        version = repr(
+            ([versions[tag] for tag in post_tags], show_group_link)
+        )
+        keys.append(
+            f'{CARD_PREFIX}{post.pk}:'
+            + hashlib.md5(version.encode()).hexdigest()
+        )
+    cards = cache.get_many(keys)
+    cache_lookup(len(cards), len(keys) - len(cards))
+    missing = {
+        key: _render_card(post, show_group_link)
+        for key, post in zip(keys, posts)
+        if key not in cards
+    }
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIMEOUT)
+        cards.update(missing)
+    return [cards[key] for key in keys]
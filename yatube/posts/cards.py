@@ -0,0 +1,116 @@
+from django.db.models.query import BaseIterable, ValuesListIterable
+
+# Столько символов текста показывает карточка (см. Post.__str__).
+PREVIEW_LENGTH = 15
+
+CARD_FIELDS = (
+    'id',
+    'excerpt',
+    'pub_date',
+    'image',
+    'group_id',
+    'group__slug',
+    'group__title',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+)
+
+
+class CardAuthor:
+    """Автор поста в карточке."""
+
+    __slots__ = ('username', 'first_name', 'last_name')
+
+    def __init__(self, username, first_name, last_name):
+        self.username = username
+        self.first_name = first_name
+        self.last_name = last_name
+
+    def __str__(self):
+        return self.username
+
+    def get_full_name(self):
+        return f'{self.first_name} {self.last_name}'.strip()
+
+
+class CardGroup:
+    """Группа поста в карточке."""
+
+    __slots__ = ('slug', 'title')
+
+    def __init__(self, slug, title):
+        self.slug = slug
+        self.title = title
+
+    def __str__(self):
+        return self.title
+
+
+class PostCard:
+    """Пост в ленте: только то, что показывает карточка.
+
+    text - сохранённое начало текста (Post.excerpt), а не весь текст.
+    """
+
+    __slots__ = (
+        'pk',
+        'text',
+        'pub_date',
+        'image',
+        'group_id',
+        'group',
+        'author',
+    )
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f'<PostCard: {self.pk}>'
+
+
+class CardIterable(BaseIterable):
+    """Выбирает только поля карточки и отдаёт строки как PostCard.
+
+    Проекция накладывается при чтении, поэтому count(), filter() и
+    срезы queryset работают как у обычного queryset постов.
+    """
+
+    def __iter__(self):
+        image = self.queryset.model._meta.get_field('image')
+        queryset = self.queryset.values_list(*CARD_FIELDS)
+        rows = ValuesListIterable(
+            queryset,
+            chunked_fetch=self.chunked_fetch,
+            chunk_size=self.chunk_size,
+        )
+        for row in rows:
+            (
+                pk,
+                text,
+                pub_date,
+                image_name,
+                group_id,
+                slug,
+                title,
+                username,
+                first_name,
+                last_name,
+            ) = row
+            card = PostCard()
+            card.pk = pk
+            card.text = text
+            card.pub_date = pub_date
+            card.image = image.attr_class(None, image, image_name)
+            card.group_id = group_id
+            card.group = CardGroup(slug, title) if group_id else None
+            card.author = CardAuthor(username, first_name, last_name)
+            yield card
+
+
+def as_cards(queryset):
+    """queryset постов, который отдаёт PostCard вместо моделей."""
+    queryset = queryset.all()
+    queryset._iterable_class = CardIterable
+    return queryset
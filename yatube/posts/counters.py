@@ -0,0 +1,73 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _shift(queryset, deltas):
+    queryset.update(
+        **{
+            field: Greatest(F(field) + delta, 0)
+            for field, delta in deltas.items()
+        }
+    )
+
+
+def bump(model, pk, **deltas):
+    """Сдвигает счётчики записи model на deltas одним UPDATE."""
+    if pk is not None:
+        _shift(model.objects.filter(pk=pk), deltas)
+
+
+def bump_user(user_id, **deltas):
+    """Сдвигает счётчики пользователя."""
+    _shift(UserStats.objects.filter(user_id=user_id), deltas)
+
+
+def stats_for(user):
+    """Счётчики пользователя; нули, если запись ещё не создана."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return UserStats(user=user)
+
+
+def _count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def recount_users(pks):
+    for user in User.objects.filter(pk__in=pks).annotate(
+        posts_total=_count(Post.objects.all(), 'author'),
+        followers_total=_count(Follow.objects.all(), 'author'),
+        following_total=_count(Follow.objects.all(), 'user'),
+    ):
+        UserStats.objects.update_or_create(
+            user=user,
+            defaults={
+                'posts_count': user.posts_total,
+                'followers_count': user.followers_total,
+                'following_count': user.following_total,
+            },
+        )
+
+
+def recount_groups(pks):
+    Group.objects.filter(pk__in=pks).update(
+        posts_count=_count(Post.objects.all(), 'group')
+    )
+
+
+def recount_posts(pks):
+    Post.objects.filter(pk__in=pks).update(
+        comments_count=_count(Comment.objects.all(), 'post')
+    )
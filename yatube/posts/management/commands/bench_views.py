@@ -0,0 +1,128 @@
+import json
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.management.commands.cache_benchmark import percentile
+from posts.models import Group, Post, UserStats
+
+
+def targets():
+    """Адреса представлений на самых крупных объектах базы."""
+    group = Group.objects.order_by('-posts_count').first()
+    author = UserStats.objects.order_by('-posts_count').first()
+    post = Post.objects.order_by('-comments_count').first()
+    reader = UserStats.objects.order_by('-following_count').first()
+    if not (group and author and post and reader):
+        raise CommandError(
+            'База пуста: сначала заполните её командой generate_dataset'
+        )
+    return {
+        'index': (reverse('posts:index'), None),
+        'group_posts': (reverse('posts:group_list', args=[group.slug]), None),
+        'profile': (
+            reverse('posts:profile', args=[author.user.username]),
+            None,
+        ),
+        'post_detail': (reverse('posts:post_detail', args=[post.pk]), None),
+        'follow_index': (reverse('posts:follow_index'), reader.user),
+    }
+
+
+def measure(client, url, repeat, cold):
+    timings, queries = [], []
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        with ExitStack() as stack:
+            # Чтения могут уходить на реплики: считаются все базы.
+            captured = [
+                stack.enter_context(CaptureQueriesContext(connection))
+                for connection in connections.all()
+            ]
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - started)
+        queries.append(sum(map(len, captured)))
+    return {
+        'url': url,
+        'status': response.status_code,
+        'p50_ms': round(percentile(timings, 0.5) * 1e3, 2),
+        'p95_ms': round(percentile(timings, 0.95) * 1e3, 2),
+        'mean_ms': round(statistics.mean(timings) * 1e3, 2),
+        'queries': max(queries),
+        'bytes': len(response.content),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет p50/p95, число запросов и размер ответа ленты, групп, '
+        'профиля, поста и подписок и сохраняет результат в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Очищать кеш перед каждым запросом',
+        )
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+        parser.add_argument('--compare', help='JSON предыдущего прогона')
+
+    def handle(self, *args, **options):
+        results = {}
+        for name, (url, user) in targets().items():
+            # Адрес вне INTERNAL_IPS, чтобы debug_toolbar не искажал замеры.
+            client = Client(
+                HTTP_HOST=settings.ALLOWED_HOSTS[0], REMOTE_ADDR='192.0.2.1'
+            )
+            if user is not None:
+                client.force_login(user)
+            client.get(url)
+            results[name] = measure(
+                client, url, options['repeat'], options['cold']
+            )
+        run = {
+            'started': timezone.now().isoformat(),
+            'repeat': options['repeat'],
+            'cold': options['cold'],
+            'views': results,
+        }
+        previous = {}
+        if options['compare']:
+            with open(options['compare']) as file:
+                previous = json.load(file)['views']
+        self.report(results, previous)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(run, file, indent=2)
+
+    def report(self, results, previous):
+        self.stdout.write(
+            f'{"view":<14} {"p50":>9} {"p95":>9} {"queries":>8} {"bytes":>9}'
+        )
+        for name, result in results.items():
+            line = (
+                f'{name:<14} {result["p50_ms"]:>7.2f}ms '
+                f'{result["p95_ms"]:>7.2f}ms {result["queries"]:>8} '
+                f'{result["bytes"]:>9}'
+            )
+            if name in previous:
+                before = previous[name]
+                line += (
+                    f'  p50 {result["p50_ms"] - before["p50_ms"]:+.2f}ms'
+                    f' p95 {result["p95_ms"] - before["p95_ms"]:+.2f}ms'
+                    f' queries {result["queries"] - before["queries"]:+d}'
+                )
+            self.stdout.write(line)
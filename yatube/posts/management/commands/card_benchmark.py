@@ -0,0 +1,57 @@
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+
+
+def measure(load, repeat):
+    """Среднее время загрузки страницы и пик памяти одной загрузки."""
+    load()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        load()
+    elapsed = (time.perf_counter() - started) / repeat
+    tracemalloc.start()
+    load()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает загрузку страницы ленты моделями Post и '
+        'карточками PostCard'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument(
+            '--per-page', type=int, default=settings.POSTS_PER_PAGE
+        )
+
+    def handle(self, *args, **options):
+        per_page = options['per_page']
+        loaders = {
+            'models': lambda: list(
+                Post.objects.select_related('group', 'author')[:per_page]
+            ),
+            'cards': lambda: list(Post.objects.cards()[:per_page]),
+        }
+        results = {
+            name: measure(load, options['repeat'])
+            for name, load in loaders.items()
+        }
+        self.stdout.write(f'{"":<8} {"time":>10} {"memory":>10}')
+        for name, (elapsed, peak) in results.items():
+            self.stdout.write(
+                f'{name:<8} {elapsed * 1e3:>8.2f}ms {peak / 1024:>8.1f}KB'
+            )
+        (full_time, full_peak), (card_time, card_peak) = results.values()
+        self.stdout.write(
+            f'Экономия на странице: {(full_time - card_time) * 1e3:.2f}ms, '
+            f'{(full_peak - card_peak) / 1024:.1f}KB'
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.cache import stampede_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает, сколько повторных пересчётов лент удалось избежать'
+
+    def handle(self, *args, **options):
+        for name, value in stampede_stats().items():
+            self.stdout.write(f'{name}: {value}')
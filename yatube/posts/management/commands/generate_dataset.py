@@ -0,0 +1,248 @@
+import heapq
+import io
+import random
+from collections import defaultdict
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from posts import timeline
+from posts.models import (
+    Comment,
+    Follow,
+    Group,
+    Post,
+    TimelineEntry,
+    User,
+    UserStats,
+)
+
+BATCH_SIZE = 1000
+IMAGE_COUNT = 20
+
+
+def popularity(count, alpha, rng):
+    """Веса по закону Ципфа: вес k-го по популярности - 1 / k ** alpha."""
+    weights = [1 / rank ** alpha for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    return weights
+
+
+def spread_dates(objects, field, start, end, rng):
+    """Случайные даты в [start, end): bulk_create ставит всем auto_now_add
+    одно время, поэтому даты задаются отдельным bulk_update."""
+    span = (end - start).total_seconds()
+    for obj in objects:
+        setattr(obj, field, start + timedelta(seconds=rng.random() * span))
+    type(objects[0]).objects.bulk_update(
+        objects, [field], batch_size=BATCH_SIZE
+    )
+
+
+def make_images(rng):
+    names = []
+    for index in range(IMAGE_COUNT):
+        color = tuple(rng.randrange(256) for _ in range(3))
+        buffer = io.BytesIO()
+        Image.new('RGB', (640, 480), color).save(buffer, 'JPEG')
+        names.append(
+            default_storage.save(
+                f'posts/dataset_{index}.jpg', ContentFile(buffer.getvalue())
+            )
+        )
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими данными: пользователи, подписки '
+        'по степенному закону, посты с картинками и всплески комментариев'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument(
+            '--posts', type=int, default=10, help='Постов на автора в среднем'
+        )
+        parser.add_argument(
+            '--follows', type=int, default=20, help='Подписок на читателя'
+        )
+        parser.add_argument('--bursts', type=int, default=100)
+        parser.add_argument(
+            '--burst-size',
+            type=int,
+            default=50,
+            help='Комментариев за всплеск',
+        )
+        parser.add_argument('--image-ratio', type=float, default=0.3)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--alpha', type=float, default=1.1)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.end = timezone.now()
+        self.start = self.end - timedelta(days=options['days'])
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            weights = popularity(len(users), options['alpha'], rng)
+            groups = self.create_groups(options['groups'])
+            self.create_follows(users, weights, options['follows'], rng)
+            posts = self.create_posts(users, weights, groups, options, rng)
+            self.create_comments(users, posts, options, rng)
+        call_command('recount_counters', stdout=self.stdout)
+        self.build_timelines()
+        cache.clear()
+
+    def create_users(self, count):
+        password = make_password('password')
+        offset = User.objects.count()
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username=f'{self.fake.user_name()}{offset + index}',
+                    first_name=self.fake.first_name(),
+                    last_name=self.fake.last_name(),
+                    email=self.fake.email(),
+                    password=password,
+                )
+                for index in range(count)
+            ]
+        )
+        # В SQLite bulk_create не возвращает pk, поэтому пользователи
+        # перечитываются.
+        users = list(User.objects.order_by('-pk')[:count])
+        self.stdout.write(f'Пользователи: {len(users)}')
+        return users
+
+    def create_groups(self, count):
+        offset = Group.objects.count()
+        Group.objects.bulk_create(
+            [
+                Group(
+                    title=self.fake.catch_phrase()[:200],
+                    slug=f'group-{offset + index}',
+                    description=self.fake.paragraph(),
+                )
+                for index in range(count)
+            ]
+        )
+        groups = list(Group.objects.order_by('-pk')[:count])
+        self.stdout.write(f'Группы: {len(groups)}')
+        return groups
+
+    def create_follows(self, users, weights, per_user, rng):
+        follows = set()
+        for user in users:
+            for author in rng.choices(users, weights, k=per_user):
+                if author.pk != user.pk:
+                    follows.add((user.pk, author.pk))
+        Follow.objects.bulk_create(
+            [
+                Follow(user_id=user_id, author_id=author_id)
+                for user_id, author_id in follows
+            ],
+            ignore_conflicts=True,
+        )
+        self.stdout.write(f'Подписки: {len(follows)}')
+
+    def create_posts(self, users, weights, groups, options, rng):
+        images = make_images(rng)
+        authors = rng.choices(
+            users, weights, k=len(users) * options['posts']
+        )
+        posts = []
+        for author in authors:
+            post = Post(
+                author=author,
+                text=self.fake.text(max_nb_chars=rng.choice((80, 400, 2000))),
+                group=rng.choice(groups) if rng.random() < 0.7 else None,
+            )
+            if rng.random() < options['image_ratio']:
+                post.image = rng.choice(images)
+            post.render_text()
+            posts.append(post)
+        Post.objects.bulk_create(posts)
+        posts = list(Post.objects.order_by('-pk')[:len(posts)])
+        spread_dates(posts, 'pub_date', self.start, self.end, rng)
+        self.stdout.write(f'Посты: {len(posts)}')
+        return posts
+
+    def create_comments(self, users, posts, options, rng):
+        """Комментарии приходят всплесками: к одному посту за час."""
+        if not options['bursts']:
+            return
+        comments = []
+        for post in rng.choices(posts, k=options['bursts']):
+            for _ in range(options['burst_size']):
+                comments.append(
+                    Comment(
+                        post=post,
+                        author=rng.choice(users),
+                        text=self.fake.sentence(),
+                        created=post.pub_date
+                        + timedelta(seconds=rng.random() * 3600),
+                    )
+                )
+        Comment.objects.bulk_create(comments)
+        created = list(Comment.objects.order_by('-pk')[:len(comments)])
+        for comment, source in zip(created, reversed(comments)):
+            comment.created = source.created
+        Comment.objects.bulk_update(
+            created, ['created'], batch_size=BATCH_SIZE
+        )
+        self.stdout.write(f'Комментарии: {len(comments)}')
+
+    def build_timelines(self):
+        """Ленты подписок, как их разложили бы сигналы при публикации."""
+        popular = UserStats.objects.filter(
+            followers_count__gte=settings.TIMELINE_PULL_THRESHOLD
+        ).values_list('user_id', flat=True)
+        for author_id in popular:
+            timeline.reclassify(author_id)
+        recent = defaultdict(list)
+        posts = (
+            Post.objects.filter(author__pulled_feed__isnull=True)
+            .order_by('-pub_date')
+            .values_list('pub_date', 'pk', 'author_id')
+        )
+        for row in posts.iterator():
+            if len(recent[row[2]]) < settings.TIMELINE_LENGTH:
+                recent[row[2]].append(row)
+        following = defaultdict(list)
+        for user_id, author_id in Follow.objects.values_list(
+            'user_id', 'author_id'
+        ).iterator():
+            following[user_id].append(recent[author_id])
+        entries = (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=pk,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for user_id, feeds in following.items()
+            for pub_date, pk, author_id in islice(
+                heapq.merge(*feeds, reverse=True), settings.TIMELINE_LENGTH
+            )
+        )
+        while True:
+            batch = list(islice(entries, BATCH_SIZE))
+            if not batch:
+                break
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        self.stdout.write(f'Ленты: {TimelineEntry.objects.count()}')
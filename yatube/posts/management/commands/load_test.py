@@ -0,0 +1,310 @@
+import io
+import logging
+import multiprocessing
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import got_request_exception
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.middleware.csrf import CSRF_TOKEN_LENGTH
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from core.management.commands.cache_benchmark import percentile
+from posts.models import Group, Post, UserStats
+from yatube.wsgi import application
+
+DEFAULT_MIX = (
+    'index=30,group_posts=15,profile=15,post_detail=15,follow_index=10,'
+    'post_create=5,add_comment=5,profile_follow=5'
+)
+LOCKED = 'database is locked'
+
+_errors = threading.local()
+
+
+def _remember_error(sender, request=None, **kwargs):
+    _errors.last = sys.exc_info()[1]
+
+
+got_request_exception.connect(_remember_error)
+
+
+def index(targets, rng):
+    return 'GET', reverse('posts:index'), None
+
+
+def group_posts(targets, rng):
+    slug = rng.choice(targets['groups'])
+    return 'GET', reverse('posts:group_list', args=[slug]), None
+
+
+def profile(targets, rng):
+    username = rng.choice(targets['usernames'])
+    return 'GET', reverse('posts:profile', args=[username]), None
+
+
+def post_detail(targets, rng):
+    post_id = rng.choice(targets['posts'])
+    return 'GET', reverse('posts:post_detail', args=[post_id]), None
+
+
+def follow_index(targets, rng):
+    return 'GET', reverse('posts:follow_index'), None
+
+
+def post_create(targets, rng):
+    data = {'text': f'Нагрузочный пост {rng.random()}'}
+    return 'POST', reverse('posts:post_create'), data
+
+
+def add_comment(targets, rng):
+    post_id = rng.choice(targets['posts'])
+    data = {'text': f'Нагрузочный комментарий {rng.random()}'}
+    return 'POST', reverse('posts:add_comment', args=[post_id]), data
+
+
+def profile_follow(targets, rng):
+    username = rng.choice(targets['usernames'])
+    return 'GET', reverse('posts:profile_follow', args=[username]), None
+
+
+SCENARIOS = {
+    scenario.__name__: scenario
+    for scenario in (
+        index,
+        group_posts,
+        profile,
+        post_detail,
+        follow_index,
+        post_create,
+        add_comment,
+        profile_follow,
+    )
+}
+
+
+def parse_mix(value):
+    """'index=30,post_create=5' -> {'index': 30.0, 'post_create': 5.0}."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise CommandError(f'Неизвестный сценарий {name}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def make_environ(method, path, data, cookie, csrf):
+    body = urlencode(data or {}).encode()
+    return {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': settings.ALLOWED_HOSTS[0],
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': settings.ALLOWED_HOSTS[0],
+        # Адрес вне INTERNAL_IPS, чтобы debug_toolbar не искажал замеры.
+        'REMOTE_ADDR': '192.0.2.1',
+        'HTTP_COOKIE': cookie,
+        'HTTP_X_CSRFTOKEN': csrf,
+        'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+
+def call(application, environ):
+    """Вызывает WSGI-приложение и возвращает код ответа."""
+    status = []
+
+    def start_response(value, headers, exc_info=None):
+        status.append(int(value.split()[0]))
+
+    response = application(environ, start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        # close() отправляет request_finished и закрывает соединения,
+        # как это делает настоящий WSGI-сервер.
+        response.close()
+    return status[0]
+
+
+def run_worker(worker, sessions, targets, mix, duration):
+    """Запросы одного воркера до конца отведённого времени."""
+    rng = random.Random(worker)
+    names, weights = list(mix), list(mix.values())
+    csrf = get_random_string(CSRF_TOKEN_LENGTH)
+    cookie = (
+        f'{settings.SESSION_COOKIE_NAME}={sessions[worker % len(sessions)]}; '
+        f'{settings.CSRF_COOKIE_NAME}={csrf}'
+    )
+    results = []
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        name = rng.choices(names, weights)[0]
+        method, path, data = SCENARIOS[name](targets, rng)
+        _errors.last = None
+        started = time.perf_counter()
+        environ = make_environ(method, path, data, cookie, csrf)
+        status = call(application, environ)
+        elapsed = time.perf_counter() - started
+        error = _errors.last
+        locked = isinstance(error, OperationalError) and LOCKED in str(error)
+        results.append((name, elapsed, status, locked))
+    return results
+
+
+@contextmanager
+def stock_sqlite():
+    """SQLite без настройки: журнал отката, отложенные транзакции и
+    соединение на каждый запрос."""
+    database = connections.databases[DEFAULT_DB_ALIAS]
+    saved = database['CONN_MAX_AGE'], database['OPTIONS']
+    database['CONN_MAX_AGE'] = 0
+    database['OPTIONS'] = {**saved[1], 'transaction_mode': 'DEFERRED'}
+    connections.close_all()
+    try:
+        with override_settings(SQLITE_PRAGMAS={}):
+            # Режим журнала хранится в файле базы: переключается один раз.
+            with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode = DELETE')
+            connections.close_all()
+            yield
+    finally:
+        database['CONN_MAX_AGE'], database['OPTIONS'] = saved
+        connections.close_all()
+
+
+def load_targets(users):
+    targets = {
+        'groups': list(Group.objects.values_list('slug', flat=True)[:100]),
+        'usernames': list(
+            UserStats.objects.order_by('-followers_count').values_list(
+                'user__username', flat=True
+            )[:1000]
+        ),
+        'posts': list(Post.objects.values_list('pk', flat=True)[:1000]),
+    }
+    if not all(targets.values()):
+        raise CommandError(
+            'База пуста: сначала заполните её командой generate_dataset'
+        )
+    sessions = []
+    for stats in UserStats.objects.order_by('-following_count')[:users]:
+        client = Client()
+        client.force_login(stats.user)
+        sessions.append(client.cookies[settings.SESSION_COOKIE_NAME].value)
+    return targets, sessions
+
+
+def run_pool(kind, jobs):
+    if kind == 'process':
+        # Соединения не должны переходить в дочерние процессы.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with context.Pool(len(jobs)) as pool:
+            return pool.starmap(run_worker, jobs)
+    with ThreadPoolExecutor(len(jobs)) as pool:
+        return list(pool.map(lambda job: run_worker(*job), jobs))
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает yatube.wsgi.application смесью чтений и записей из пула '
+        'потоков или процессов и показывает пропускную способность, '
+        'задержки и долю ошибок database is locked'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument(
+            '--pool', choices=('thread', 'process'), default='thread'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10, help='Секунд нагрузки'
+        )
+        parser.add_argument(
+            '--mix',
+            type=parse_mix,
+            default=DEFAULT_MIX,
+            help=f'Веса сценариев, по умолчанию {DEFAULT_MIX}',
+        )
+        parser.add_argument(
+            '--users', type=int, default=20, help='Сколько разных читателей'
+        )
+        parser.add_argument(
+            '--baseline',
+            action='store_true',
+            help='Без SQLITE_PRAGMAS и CONN_MAX_AGE, для сравнения',
+        )
+        parser.add_argument(
+            '--write-queue',
+            action='store_true',
+            help='Записи через поток-писатель (WRITE_QUEUE_ENABLED)',
+        )
+
+    def handle(self, *args, **options):
+        targets, sessions = load_targets(options['users'])
+        jobs = [
+            (worker, sessions, targets, options['mix'], options['duration'])
+            for worker in range(options['workers'])
+        ]
+        if options['verbosity'] < 2:
+            # Ошибки попадают в отчёт, трассировки в логе им не нужны.
+            logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        database = stock_sqlite() if options['baseline'] else nullcontext()
+        queue = override_settings(WRITE_QUEUE_ENABLED=options['write_queue'])
+        with database, queue:
+            started = time.perf_counter()
+            results = run_pool(options['pool'], jobs)
+            elapsed = time.perf_counter() - started
+        self.report([row for rows in results for row in rows], elapsed)
+
+    def report(self, rows, elapsed):
+        by_scenario = defaultdict(list)
+        for row in rows:
+            by_scenario[row[0]].append(row)
+        self.stdout.write(
+            f'{"scenario":<15} {"count":>6} {"p50":>9} {"p95":>9} '
+            f'{"p99":>9} {"errors":>7} {"locked":>7}'
+        )
+        for name, scenario_rows in sorted(by_scenario.items()):
+            self.write_row(name, scenario_rows)
+        self.write_row('total', rows)
+        locked = sum(row[3] for row in rows)
+        self.stdout.write(
+            f'Пропускная способность: {len(rows) / elapsed:.1f} req/s, '
+            f'database is locked: {locked / max(len(rows), 1):.2%}'
+        )
+
+    def write_row(self, name, rows):
+        timings = [row[1] for row in rows]
+        errors = sum(row[2] >= 500 for row in rows)
+        locked = sum(row[3] for row in rows)
+        self.stdout.write(
+            f'{name:<15} {len(rows):>6} '
+            f'{percentile(timings, 0.5) * 1e3:>7.1f}ms '
+            f'{percentile(timings, 0.95) * 1e3:>7.1f}ms '
+            f'{percentile(timings, 0.99) * 1e3:>7.1f}ms '
+            f'{errors:>7} {locked:>7}'
+        )
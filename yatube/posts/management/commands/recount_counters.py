@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import recount_groups, recount_posts, recount_users
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько записей пересчитывать в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        targets = (
+            (User, recount_users),
+            (Group, recount_groups),
+            (Post, recount_posts),
+        )
+        for model, recount in targets:
+            pks = model.objects.order_by('pk').values_list('pk', flat=True)
+            last_pk = 0
+            total = 0
+            while True:
+                batch = list(pks.filter(pk__gt=last_pk)[:batch_size])
+                if not batch:
+                    break
+                with transaction.atomic():
+                    recount(batch)
+                last_pk = batch[-1]
+                total += len(batch)
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {total}')
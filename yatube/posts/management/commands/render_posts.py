@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Заново заполняет начало текста и HTML постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько постов обновлять в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = Post.objects.order_by('pk').only('text')
+        last_pk = 0
+        total = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            for post in batch:
+                post.render_text()
+            with transaction.atomic():
+                Post.objects.bulk_update(batch, ['excerpt', 'text_html'])
+            last_pk = batch[-1].pk
+            total += len(batch)
+        self.stdout.write(f'{Post._meta.verbose_name_plural}: {total}')
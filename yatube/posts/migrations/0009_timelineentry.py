@@ -0,0 +1,83 @@
+# Generated by Django 2.2.28 on 2026-10-18 06:09
+
+import heapq
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_timelines(apps, schema_editor):
+    """Ленты подписок: последние TIMELINE_LENGTH постов всех авторов,
+    на которых подписан пользователь, слитые по дате."""
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    recent = {}
+
+    def posts_of(author_id):
+        if author_id not in recent:
+            recent[author_id] = list(
+                Post.objects.filter(author_id=author_id)
+                .order_by('-pub_date')
+                .values_list('pub_date', 'pk', 'author_id')[
+                    :settings.TIMELINE_LENGTH
+                ]
+            )
+        return recent[author_id]
+
+    following = defaultdict(list)
+    for user_id, author_id in Follow.objects.values_list(
+        'user_id', 'author_id'
+    ).iterator():
+        following[user_id].append(author_id)
+    for user_id, authors in following.items():
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(
+                user_id=user_id,
+                post_id=pk,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for pub_date, pk, author_id in islice(
+                heapq.merge(*map(posts_of, authors), reverse=True),
+                settings.TIMELINE_LENGTH,
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0008_auto_20221118_1622'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+                'ordering': ('-pub_date',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-pub_date'], name='timeline_user_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.28 on 2026-10-18 06:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0009_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PulledAuthor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('since', models.DateTimeField(auto_now_add=True, verbose_name='Подтягивается с')),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pulled_feed', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Подтягиваемый автор',
+                'verbose_name_plural': 'Подтягиваемые авторы',
+            },
+        ),
+    ]
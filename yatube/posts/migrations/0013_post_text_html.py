@@ -0,0 +1,42 @@
+# Generated by Django 2.2.28 on 2026-10-18 06:29
+
+from django.db import migrations, models
+from django.template.defaultfilters import linebreaksbr
+
+BATCH_SIZE = 500
+
+
+def render_texts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.order_by('pk').only('text')
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        for post in batch:
+            post.excerpt = post.text[:15]
+            post.text_html = linebreaksbr(post.text)
+        Post.objects.bulk_update(batch, ['excerpt', 'text_html'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(default='', editable=False, max_length=15, verbose_name='Начало текста'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(default='', editable=False, verbose_name='Текст в HTML'),
+        ),
+        migrations.RunPython(render_texts, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.template.defaultfilters import linebreaksbr
+
+from .cards import PREVIEW_LENGTH, as_cards
 
 
 User = get_user_model()
@@ -11,6 +14,9 @@ class Group(models.Model):
     title = models.CharField('Группа', max_length=200)
     slug = models.SlugField('Адрес', unique=True)
     description = models.TextField('Описание')
+    posts_count = models.PositiveIntegerField(
+        'Количество постов', default=0, editable=False
+    )
 
     class Meta:
         verbose_name = 'Группа'
@@ -20,6 +26,12 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def cards(self):
+        """Посты как компактные PostCard для лент."""
+        return as_cards(self)
+
+
 class Post(models.Model):
     """Модель, описывающая конкретный пост в блоге"""
 
@@ -41,14 +53,49 @@ class Post(models.Model):
         help_text='Группа, к которой будет относиться пост',
     )
     image = models.ImageField('Картинка', upload_to='posts/', blank=True)
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев', default=0, editable=False
+    )
+    excerpt = models.CharField(
+        'Начало текста',
+        max_length=PREVIEW_LENGTH,
+        default='',
+        editable=False,
+    )
+    text_html = models.TextField('Текст в HTML', default='', editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'], name='post_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx',
+            ),
+        ]
 
     def __str__(self):
-        return self.text[:15]
+        return self.text[:PREVIEW_LENGTH]
+
+    def save(self, *args, **kwargs):
+        self.render_text()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt', 'text_html'}
+        super().save(*args, **kwargs)
+
+    def render_text(self):
+        """Заполняет excerpt и text_html по тексту поста."""
+        self.excerpt = self.text[:PREVIEW_LENGTH]
+        self.text_html = linebreaksbr(self.text)
 
 
 class Comment(models.Model):
@@ -75,6 +122,12 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx',
+            )
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -104,6 +157,99 @@ class Follow(models.Model):
                 fields=['user', 'author'], name='unique_follow'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            )
+        ]
 
     def __str__(self):
         return f'{ self.user.username } --> { self.author.username }'
+
+
+class TimelineEntry(models.Model):
+    """Запись ленты подписок, разложенная подписчику при публикации"""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        ordering = ('-pub_date',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-id'],
+                name='timeline_user_date_idx',
+            )
+        ]
+
+    def __str__(self):
+        return f'{ self.user_id } <-- { self.post_id }'
+
+
+class PulledAuthor(models.Model):
+    """Автор с большим числом подписчиков: его посты не раскладываются
+    по лентам при публикации, а подтягиваются при чтении"""
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='pulled_feed',
+        verbose_name='Автор',
+    )
+    since = models.DateTimeField('Подтягивается с', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Подтягиваемый автор'
+        verbose_name_plural = 'Подтягиваемые авторы'
+
+    def __str__(self):
+        return str(self.author)
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, обновляемые вместе с постами и подписками"""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Количество постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0
+    )
+    following_count = models.PositiveIntegerField(
+        'Количество подписок', default=0
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return str(self.user)
@@ -0,0 +1,168 @@
+import threading
+
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from . import timeline
+from .cache import (
+    author_name_tag,
+    author_tag,
+    group_tag,
+    index_tag,
+    invalidate,
+    post_tag,
+)
+from .counters import bump, bump_user
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+# Посты, удаляемые в этом потоке: их комментарии уходят каскадом, и
+# счётчик с тегом поста на каждый комментарий не сдвигаются.
+_deleting = threading.local()
+
+
+def _deleting_posts():
+    if not hasattr(_deleting, 'posts'):
+        _deleting.posts = set()
+    return _deleting.posts
+
+
+def invalidate_post(post, group_ids):
+    slugs = Group.objects.filter(
+        pk__in=[pk for pk in group_ids if pk is not None]
+    ).values_list('slug', flat=True)
+    invalidate(
+        index_tag(),
+        author_tag(post.author.username),
+        post_tag(post.pk),
+        *map(group_tag, slugs),
+    )
+
+
+NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=User)
+def remember_names(sender, instance, update_fields=None, **kwargs):
+    instance._saved_names = None
+    # Вход в систему сохраняет только last_login: имена не читаются.
+    if instance.pk and (
+        update_fields is None or set(update_fields) & set(NAME_FIELDS)
+    ):
+        instance._saved_names = (
+            User.objects.filter(pk=instance.pk)
+            .values_list(*NAME_FIELDS)
+            .first()
+        )
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    saved = getattr(instance, '_saved_names', None)
+    names = tuple(getattr(instance, field) for field in NAME_FIELDS)
+    if saved is None or saved == names:
+        return
+    usernames = {saved[0], instance.username}
+    # Имя и ссылка на профиль есть и в общей ленте, и в лентах групп.
+    slugs = (
+        Group.objects.filter(group_posts__author=instance)
+        .values_list('slug', flat=True)
+        .distinct()
+    )
+    invalidate(
+        index_tag(),
+        *map(group_tag, slugs),
+        *map(author_tag, usernames),
+        *map(author_name_tag, usernames),
+    )
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    instance._saved_group_id = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list('group_id', flat=True)
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        bump_user(instance.author_id, posts_count=1)
+        bump(Group, instance.group_id, posts_count=1)
+        timeline.push_post(instance)
+    elif instance._saved_group_id != instance.group_id:
+        bump(Group, instance._saved_group_id, posts_count=-1)
+        bump(Group, instance.group_id, posts_count=1)
+    invalidate_post(instance, {instance.group_id, instance._saved_group_id})
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    _deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    _deleting_posts().discard(instance.pk)
+    bump_user(instance.author_id, posts_count=-1)
+    bump(Group, instance.group_id, posts_count=-1)
+    invalidate_post(instance, {instance.group_id})
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        bump(Post, instance.post_id, comments_count=1)
+        invalidate(post_tag(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id in _deleting_posts():
+        return
+    bump(Post, instance.post_id, comments_count=-1)
+    invalidate(post_tag(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        bump_user(instance.user_id, following_count=1)
+        bump_user(instance.author_id, followers_count=1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        timeline.reclassify(instance.author_id)
+        invalidate(
+            author_tag(instance.user.username),
+            author_tag(instance.author.username),
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    bump_user(instance.user_id, following_count=-1)
+    bump_user(instance.author_id, followers_count=-1)
+    timeline.remove_author(instance.user_id, instance.author_id)
+    timeline.reclassify(instance.author_id)
+    invalidate(
+        author_tag(instance.user.username),
+        author_tag(instance.author.username),
+    )
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, **kwargs):
+    invalidate(index_tag(), group_tag(instance.slug))
@@ -0,0 +1,16 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.cache import post_cards as cached_cards
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(page_obj, show_group_link=True):
+    """Карточки постов страницы из кеша фрагментов."""
+    return [
+        mark_safe(card)
+        for card in cached_cards(page_obj.object_list, show_group_link)
+    ]
@@ -0,0 +1,398 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.db import connection, connections, transaction
+from django.test import (
+    Client,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils import translation
+
+from core.management.commands.sync_replicas import copy_database
+from posts import cache as posts_cache
+from posts.cache import (
+    cache_tagged,
+    index_tag,
+    invalidate,
+    post_cards,
+    stampede_stats,
+    tag_versions,
+)
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+class TaggedCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Blogger')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            'author': reverse(
+                'posts:profile', kwargs={'username': 'Blogger'}
+            ),
+            'other': reverse('posts:profile', kwargs={'username': 'Other'}),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Первый пост', author=self.author, group=self.group
+        )
+        self.warm()
+
+    def warm(self):
+        for url in self.urls.values():
+            self.client.get(url)
+
+    def cached(self):
+        """Страницы, которые сейчас отдаются из кеша."""
+        return {
+            name
+            for name, url in self.urls.items()
+            if self.client.get(url).context is None
+        }
+
+    def test_pages_are_cached(self):
+        """Ленты отдаются из кеша."""
+        self.assertEqual(self.cached(), set(self.urls))
+
+    def test_pages_are_cached_per_user(self):
+        """Пользователь не получает страницу, закешированную для другого."""
+        reader = User.objects.create_user(username='Reader')
+        self.client.force_login(reader)
+        self.assertContains(
+            self.client.get(self.urls['author']), 'Пользователь: Reader'
+        )
+        self.client.logout()
+        response = self.client.get(self.urls['author'])
+        self.assertNotContains(response, 'Reader')
+        self.client.force_login(self.other)
+        response = self.client.get(self.urls['author'])
+        self.assertContains(response, 'Пользователь: Other')
+        self.assertNotContains(response, 'Reader')
+
+    def test_new_post_evicts_only_affected_pages(self):
+        """Новый пост вытесняет только ленты, где он появится."""
+        Post.objects.create(text='Второй пост', author=self.other)
+        self.assertEqual(self.cached(), {'group', 'author'})
+        response = self.client.get(self.urls['index'])
+        self.assertContains(response, 'Второй пост')
+
+    def test_edit_and_delete_evict_pages(self):
+        """Правка и удаление поста вытесняют его ленты."""
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        self.assertEqual(self.cached(), {'other'})
+        self.assertContains(
+            self.client.get(self.urls['index']), 'Исправленный'
+        )
+        self.warm()
+        self.post.delete()
+        self.assertEqual(self.cached(), {'other'})
+
+    def test_rename_evicts_feeds_with_author(self):
+        """Переименование автора вытесняет ленты с его постами."""
+        self.author.username = 'Renamed'
+        self.author.save()
+        self.assertEqual(self.cached(), {'other'})
+        for url in (self.urls['index'], self.urls['group']):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, '/profile/Renamed/')
+                self.assertNotContains(response, '/profile/Blogger/')
+
+    def test_comment_and_follow_keep_feeds(self):
+        """Комментарий не трогает ленты, подписка - только профили."""
+        Comment.objects.create(
+            post=self.post, author=self.other, text='Комментарий'
+        )
+        self.assertEqual(self.cached(), set(self.urls))
+        Follow.objects.create(user=self.other, author=self.author)
+        self.assertEqual(self.cached(), {'index', 'group'})
+
+
+class InvalidateOnCommitTests(TransactionTestCase):
+    def test_page_rendered_before_commit_is_evicted(self):
+        """Страница, сохранённая до фиксации поста, вытесняется после неё."""
+        author = User.objects.create_user(username='Blogger')
+        cache.clear()
+        with transaction.atomic():
+            Post.objects.create(text='Новый пост', author=author)
+            # Версия, под которой сохранил бы страницу параллельный
+            # читатель, ещё не видящий пост.
+            inside = tag_versions([index_tag()])
+        self.assertNotEqual(tag_versions([index_tag()]), inside)
+
+
+class StampedeTests(SimpleTestCase):
+    # invalidate() откладывает сброс до фиксации через соединение с базой.
+    databases = {'default'}
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        self.factory = RequestFactory()
+        self.stored = []
+        self.locks = []
+        store, add = cache.set, cache.add
+
+        def remember(key, *args, **kwargs):
+            if 'cache_page' in key:
+                self.stored.append(key)
+            return store(key, *args, **kwargs)
+
+        def remember_lock(key, *args, **kwargs):
+            if '.lock.' in key:
+                self.locks.append(key)
+            return add(key, *args, **kwargs)
+
+        for name, spy in (('set', remember), ('add', remember_lock)):
+            patcher = mock.patch.object(cache, name, spy)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        @cache_tagged(60, lambda request: ['stampede'])
+        def view(request):
+            self.calls += 1
+            time.sleep(0.2)
+            return HttpResponse(f'render {self.calls}')
+
+        self.view = view
+
+    def get(self, language=None):
+        with translation.override(language or translation.get_language()):
+            request = self.factory.get('/feed/')
+            request.user = AnonymousUser()
+            return self.view(request).content
+
+    def page_keys(self):
+        """Ключи сохранённых страниц, без обращения к устройству бэкенда."""
+        return list(dict.fromkeys(self.stored))
+
+    def test_concurrent_misses_render_once(self):
+        """Одновременные промахи ждут один пересчёт."""
+        self.get()
+        cache.delete_many(self.page_keys())
+        self.concurrent_gets(3)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(stampede_stats()['waited'], 2)
+
+    def concurrent_gets(self, count):
+        language = translation.get_language()
+        threads = [
+            threading.Thread(target=self.get, args=(language,))
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_concurrent_requests_after_invalidate_render_once(self):
+        """После сброса тега страницу пересчитывает один запрос."""
+        self.get()
+        invalidate('stampede')
+        self.concurrent_gets(4)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(stampede_stats()['waited'], 3)
+        self.assertEqual(stampede_stats()['recomputes'], 2)
+
+    def test_expired_entry_served_while_recomputing(self):
+        """Пока страницу пересчитывают, остальные получают старую копию."""
+        self.get()
+        (key,) = self.page_keys()
+        entry = cache.get(key)
+        entry['expires'] = time.time() - 1
+        cache.set(key, entry)
+        (lock_key,) = self.locks
+        cache.add(lock_key, 1)
+        self.assertEqual(self.get(), b'render 1')
+        cache.delete(lock_key)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(stampede_stats()['stale_served'], 1)
+        self.assertEqual(stampede_stats()['duplicates_avoided'], 1)
+        self.assertEqual(self.get(), b'render 2')
+        self.assertEqual(stampede_stats()['recomputes'], 2)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Blogger')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        cls.index = reverse('posts:index')
+        cls.detail = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.pk}
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_pages_not_modified(self):
+        """Неизменившаяся страница отдаётся как 304 только по ETag."""
+        for url in (self.index, self.detail):
+            response = self.client.get(url)
+            again = self.revalidate(url, response)
+            self.assertEqual(again.status_code, 304)
+            self.assertIsNone(again.context)
+            self.assertFalse(response.has_header('Last-Modified'))
+            since = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT'
+            )
+            self.assertEqual(since.status_code, 200)
+
+    def test_changes_and_user_invalidate_validators(self):
+        """Новый пост, комментарий и другой пользователь меняют ETag."""
+        index = self.client.get(self.index)
+        detail = self.client.get(self.detail)
+        Post.objects.create(text='Новый пост', author=self.reader)
+        self.assertEqual(self.revalidate(self.index, index).status_code, 200)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        self.assertEqual(
+            self.revalidate(self.detail, detail).status_code, 200
+        )
+        detail = self.client.get(self.detail)
+        self.client.force_login(self.reader)
+        self.assertEqual(
+            self.revalidate(self.detail, detail).status_code, 200
+        )
+
+    def test_login_changes_etag(self):
+        """Новый вход меняет CSRF-токен, а с ним и ETag формы."""
+        self.reader.set_password('password')
+        self.reader.save()
+        credentials = {'username': 'Reader', 'password': 'password'}
+        self.client.post(reverse('users:login'), credentials)
+        detail = self.client.get(self.detail)
+        self.client.logout()
+        self.client.post(reverse('users:login'), credentials)
+        self.assertEqual(
+            self.revalidate(self.detail, detail).status_code, 200
+        )
+
+
+class PostCardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Blogger')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+        Post.objects.create(text='Второй пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def rendered(self, show_group_link=True):
+        """Число карточек, отрисованных заново."""
+        with mock.patch.object(
+            posts_cache, 'render_to_string', wraps=posts_cache.render_to_string
+        ) as render:
+            cards = post_cards(Post.objects.all(), show_group_link)
+        return render.call_count, cards
+
+    def test_cards_rendered_once(self):
+        """Карточки отрисовываются один раз и берутся из кеша."""
+        self.assertEqual(self.rendered()[0], 2)
+        count, cards = self.rendered()
+        self.assertEqual(count, 0)
+        self.assertIn('Второй пост', cards[0])
+        self.assertIn('все записи группы', cards[1])
+        self.assertEqual(self.rendered(show_group_link=False)[0], 2)
+
+    def test_edit_and_group_change_refresh_card(self):
+        """Правка поста и группы перерисовывает только их карточку."""
+        self.rendered()
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        count, cards = self.rendered()
+        self.assertEqual(count, 1)
+        self.assertIn('Исправленный', cards[1])
+        self.group.title = 'Новое название'
+        self.group.save()
+        count, cards = self.rendered()
+        self.assertEqual(count, 1)
+        self.assertIn('Новое название', cards[1])
+
+    def test_author_rename_refreshes_cards(self):
+        """Смена имени автора перерисовывает его карточки."""
+        self.rendered()
+        self.author.first_name = 'Лев'
+        self.author.last_name = 'Толстой'
+        self.author.save()
+        count, cards = self.rendered()
+        self.assertEqual(count, 2)
+        self.assertIn('Лев Толстой', cards[0])
+        Post.objects.create(text='Третий пост', author=self.author)
+        self.assertEqual(self.rendered()[0], 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class LaggingReplicaTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Blogger')
+        self.post = Post.objects.create(
+            text='Старый текст', author=self.author
+        )
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        path = os.path.join(directory, 'replica.sqlite3')
+        # Реплика снята до правки и больше не синхронизируется.
+        copy_database(connection, path)
+        connections.databases['replica'] = {
+            **connection.settings_dict,
+            'NAME': path,
+        }
+        self.addCleanup(connections.databases.pop, 'replica')
+        self.addCleanup(lambda: connections['replica'].close())
+        self.index = reverse('posts:index')
+
+    def test_writer_sees_own_edit(self):
+        """Записавший не получает страницы и карточки с отстающей реплики."""
+        self.client.force_login(self.author)
+        self.client.get(self.index)
+        response = self.client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Новый текст'},
+        )
+        self.assertIn('primary_pin', response.cookies)
+        # Другой читатель отрисовывает ленту и карточку с реплики.
+        self.assertContains(Client().get(self.index), 'Старый текст')
+        response = self.client.get(self.index)
+        self.assertContains(response, 'Новый текст')
+        self.assertNotContains(response, 'Старый текст')
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from posts.cards import PREVIEW_LENGTH, PostCard
+from posts.models import Group, Post
+
+
+User = get_user_model()
+
+
+class PostCardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='Blogger', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Очень длинный текст поста' * 100,
+            author=cls.author,
+            group=cls.group,
+            image='posts/small.gif',
+        )
+        Post.objects.create(text='Без группы', author=cls.author)
+
+    def test_card_fields(self):
+        """Карточка содержит всё, что показывает лента."""
+        card, single = Post.objects.cards().order_by('pk')
+        self.assertIsInstance(card, PostCard)
+        self.assertFalse(hasattr(card, '__dict__'))
+        self.assertEqual(card.pk, self.post.pk)
+        self.assertEqual(card.text, self.post.text[:PREVIEW_LENGTH])
+        self.assertEqual(str(card), str(self.post))
+        self.assertEqual(card.pub_date, self.post.pub_date)
+        self.assertEqual(card.image.name, 'posts/small.gif')
+        self.assertEqual(card.group.slug, 'test-slug')
+        self.assertEqual(str(card.group), 'Тестовая группа')
+        self.assertEqual(card.author.username, 'Blogger')
+        self.assertEqual(card.author.get_full_name(), 'Лев Толстой')
+        self.assertIsNone(single.group)
+        self.assertFalse(single.image)
+
+    def test_card_query_skips_full_text(self):
+        """Полный текст не читается, подсчёт идёт без соединений."""
+        with CaptureQueriesContext(connection) as queries:
+            list(Post.objects.cards())
+            Post.objects.cards().count()
+        select, count = (query['sql'] for query in queries)
+        self.assertNotIn('"posts_post"."text"', select)
+        self.assertIn('"posts_post"."excerpt"', select)
+        self.assertNotIn('JOIN', count)
@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+
+from posts.management.commands.load_test import (
+    load_targets,
+    parse_mix,
+    run_worker,
+)
+from posts.models import Comment, Follow, Post, TimelineEntry, UserStats
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class DatasetCommandsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'generate_dataset',
+            users=30,
+            groups=3,
+            posts=3,
+            follows=5,
+            bursts=2,
+            burst_size=4,
+            stdout=StringIO(),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_dataset_consistent(self):
+        """Сгенерированные данные согласованы со счётчиками и лентами."""
+        self.assertEqual(UserStats.objects.count(), 30)
+        self.assertEqual(
+            UserStats.objects.aggregate(total=Sum('posts_count'))['total'],
+            Post.objects.count(),
+        )
+        self.assertEqual(
+            Post.objects.aggregate(total=Sum('comments_count'))['total'],
+            Comment.objects.count(),
+        )
+        self.assertEqual(Comment.objects.count(), 8)
+        self.assertGreater(
+            Post.objects.values('pub_date').distinct().count(), 1
+        )
+        self.assertFalse(Post.objects.filter(text_html='').exists())
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(
+                user_id=follow.user_id, author_id=follow.author_id
+            ).count(),
+            Post.objects.filter(author_id=follow.author_id).count(),
+        )
+
+    def test_bench_views(self):
+        """Замеры всех представлений сохраняются в JSON."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        path = os.path.join(directory, 'bench.json')
+        call_command('bench_views', repeat=2, output=path, stdout=StringIO())
+        output = StringIO()
+        call_command('bench_views', repeat=2, compare=path, stdout=output)
+        with open(path) as file:
+            views = json.load(file)['views']
+        self.assertEqual(
+            set(views),
+            {'index', 'group_posts', 'profile', 'post_detail', 'follow_index'},
+        )
+        for name, result in views.items():
+            with self.subTest(view=name):
+                self.assertEqual(result['status'], 200)
+                self.assertGreater(result['bytes'], 0)
+        self.assertIn('p95', output.getvalue())
+
+    def test_load_worker(self):
+        """Воркер нагрузки проходит чтения и записи через WSGI."""
+        targets, sessions = load_targets(users=2)
+        mix = parse_mix('index,post_detail,post_create,add_comment')
+        posts = Post.objects.count()
+        rows = run_worker(0, sessions, targets, mix, duration=0.5)
+        self.assertEqual({name for name, *_ in rows} - set(mix), set())
+        for name, elapsed, status, locked in rows:
+            with self.subTest(scenario=name):
+                self.assertIn(status, (200, 302))
+                self.assertFalse(locked)
+        created = sum(name == 'post_create' for name, *_ in rows)
+        self.assertEqual(Post.objects.count(), posts + created)
@@ -0,0 +1,115 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Follow, Group, Post, UserStats
+
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Blogger')
+        cls.reader = User.objects.create_user(username='Follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+
+    def assertCounters(self, user, **expected):
+        stats = UserStats.objects.get(user=user)
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(stats, field), value)
+
+    def test_post_and_comment_counters(self):
+        """Счётчики постов и комментариев следуют за записью и удалением."""
+        post = Post.objects.create(
+            text='Тестовый текст', author=self.author, group=self.group
+        )
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        self.assertCounters(self.author, posts_count=1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        post.group = self.other_group
+        post.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+        post.delete()
+        self.assertCounters(self.author, posts_count=0)
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.other_group.posts_count, 0)
+
+    def test_post_delete_skips_comment_counters(self):
+        """Удаление поста не сдвигает счётчик на каждый его комментарий."""
+        queries = []
+        for comments in (2, 20):
+            post = Post.objects.create(text='Пост', author=self.author)
+            Comment.objects.bulk_create(
+                Comment(post=post, author=self.reader, text='Комментарий')
+                for _ in range(comments)
+            )
+            with CaptureQueriesContext(connection) as captured:
+                post.delete()
+            queries.append(len(captured))
+        self.assertEqual(queries[0], queries[1])
+        self.assertFalse(Comment.objects.exists())
+        post = Post.objects.create(text='Пост', author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_follow_counters(self):
+        """Счётчики подписчиков и подписок следуют за подпиской."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertCounters(self.author, followers_count=1)
+        self.assertCounters(self.reader, following_count=1)
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertCounters(self.author, followers_count=0)
+        self.assertCounters(self.reader, following_count=0)
+
+    def test_recount_command_repairs_counters(self):
+        """Команда recount_counters восстанавливает счётчики."""
+        post = Post.objects.create(
+            text='Тестовый текст', author=self.author, group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.update(
+            posts_count=7, followers_count=7, following_count=7
+        )
+        Group.objects.update(posts_count=7)
+        Post.objects.update(comments_count=7)
+        call_command('recount_counters', batch_size=1, stdout=StringIO())
+        self.assertCounters(
+            self.author, posts_count=1, followers_count=1, following_count=0
+        )
+        self.assertCounters(self.reader, following_count=1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
@@ -1,4 +1,7 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
 from ..models import Group, Post
@@ -52,3 +55,36 @@ class PostModelTests(TestCase):
                 self.assertEqual(
                     self.post._meta.get_field(value).help_text, expected
                 )
+
+
+class PostTextTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+
+    def test_text_rendered_on_save(self):
+        """При сохранении заполняются начало текста и HTML."""
+        post = Post.objects.create(
+            author=self.user, text='<b>Первая</b>\nвторая'
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, '<b>Первая</b>\nв')
+        self.assertEqual(
+            post.text_html, '&lt;b&gt;Первая&lt;/b&gt;<br>вторая'
+        )
+        post.text = 'Новый текст'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, 'Новый текст')
+        self.assertEqual(post.text_html, 'Новый текст')
+
+    def test_render_posts_command(self):
+        """Команда заполняет HTML постов, сохранённых в обход save()."""
+        Post.objects.bulk_create(
+            [Post(author=self.user, text=f'Пост\n{i}') for i in range(3)]
+        )
+        call_command('render_posts', batch_size=2, stdout=StringIO())
+        self.assertEqual(
+            set(Post.objects.values_list('excerpt', 'text_html')),
+            {(f'Пост\n{i}', f'Пост<br>{i}') for i in range(3)},
+        )
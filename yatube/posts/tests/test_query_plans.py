@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+class QueryPlanTests(TestCase):
+    """Запросы лент не должны сканировать таблицы и сортировать во
+    временном B-дереве: для каждого есть подходящий индекс."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Blogger')
+        cls.reader = User.objects.create_user(username='Follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(15):
+            cls.post = Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedPlans(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        for query in queries.captured_queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            for step in self.explain(query['sql']):
+                with self.subTest(url=url, sql=query['sql'], step=step):
+                    self.assertNotIn('TEMP B-TREE', step)
+                    self.assertFalse(
+                        step.startswith('SCAN') and ' USING ' not in step,
+                        'полный просмотр таблицы',
+                    )
+
+    def feed_urls(self):
+        return (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'Blogger'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:comments_more', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+        )
+
+    def test_feed_query_plans(self):
+        """Запросы лент используют индексы."""
+        for url in self.feed_urls():
+            self.assertIndexedPlans(url)
+            self.assertIndexedPlans(url + '?page=2')
+
+    @override_settings(POSTS_KEYSET_PAGINATION=True)
+    def test_keyset_query_plans(self):
+        """Курсорные страницы лент используют индексы."""
+        for url in self.feed_urls():
+            response = self.client.get(url)
+            self.assertIndexedPlans(url)
+            page_obj = response.context.get('page_obj')
+            if page_obj is not None:
+                self.assertIndexedPlans(f'{url}?after={page_obj.next_cursor}')
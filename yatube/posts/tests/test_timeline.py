@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Post, PulledAuthor, TimelineEntry
+
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Blogger')
+        cls.reader = User.objects.create_user(username='Follower')
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def feed_texts(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        """Подписка наполняет ленту, отписка её очищает."""
+        Post.objects.create(text='Старый пост', author=self.author)
+        self.client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'Blogger'})
+        )
+        self.assertEqual(self.feed_texts(), ['Старый пост'])
+        self.client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'Blogger'})
+        )
+        self.assertEqual(self.feed_texts(), [])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_new_post_pushed_to_followers(self):
+        """Новый пост попадает в ленту подписчика и уходит при удалении."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(self.feed_texts(), ['Новый пост'])
+        self.client.force_login(self.author)
+        self.client.get(
+            reverse('posts:post_delete_confirm', kwargs={'post_id': post.pk})
+        )
+        self.client.force_login(self.reader)
+        self.assertEqual(self.feed_texts(), [])
+
+    @override_settings(TIMELINE_LENGTH=3)
+    def test_timeline_is_capped(self):
+        """Лента подписчика не длиннее TIMELINE_LENGTH."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(5):
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3
+        )
+        self.assertEqual(self.feed_texts(), ['Пост 4', 'Пост 3', 'Пост 2'])
+
+    @override_settings(TIMELINE_LENGTH=2)
+    def test_push_trims_all_followers_in_one_query(self):
+        """Обрезка лент не зависит от числа подписчиков."""
+        for i in range(10):
+            fan = User.objects.create_user(username=f'Fan{i}')
+            Follow.objects.create(user=fan, author=self.author)
+        Post.objects.create(text='Первый', author=self.author)
+        Post.objects.create(text='Второй', author=self.author)
+        with CaptureQueriesContext(connection) as queries:
+            Post.objects.create(text='Третий', author=self.author)
+        deletes = [
+            query for query in queries
+            if query['sql'].startswith('DELETE FROM "posts_timelineentry"')
+        ]
+        self.assertEqual(len(deletes), 1)
+        self.assertEqual(TimelineEntry.objects.count(), 20)
+        self.assertFalse(
+            TimelineEntry.objects.filter(post__text='Первый').exists()
+        )
+
+    @override_settings(TIMELINE_PULL_THRESHOLD=2)
+    def test_popular_author_is_pulled_on_read(self):
+        """Посты популярного автора подтягиваются при чтении ленты."""
+        fan = User.objects.create_user(username='Fan')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=fan, author=self.author)
+        self.assertTrue(
+            PulledAuthor.objects.filter(author=self.author).exists()
+        )
+        Post.objects.create(text='Громкий пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed_texts(), ['Громкий пост'])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.feed_texts(), ['Громкий пост'])
+        self.assertFalse(
+            [
+                query for query in queries
+                if query['sql'].startswith(('INSERT', 'DELETE', 'BEGIN'))
+            ]
+        )
+
+    @override_settings(TIMELINE_PULL_THRESHOLD=2, TIMELINE_LENGTH=3)
+    def test_pulled_author_older_than_full_timeline(self):
+        """Старые посты подтягиваемого автора не пишутся при каждом чтении."""
+        fan = User.objects.create_user(username='Fan')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=fan, author=self.author)
+        Post.objects.create(text='Давний пост', author=self.author)
+        other = User.objects.create_user(username='Other')
+        Follow.objects.create(user=self.reader, author=other)
+        for i in range(3):
+            Post.objects.create(text=f'Свежий {i}', author=other)
+        self.assertEqual(
+            self.feed_texts(), ['Свежий 2', 'Свежий 1', 'Свежий 0']
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.feed_texts()
+        self.assertFalse(
+            [
+                query for query in queries
+                if query['sql'].startswith(('INSERT', 'DELETE', 'BEGIN'))
+            ]
+        )
+
+    @override_settings(TIMELINE_PULL_THRESHOLD=2)
+    def test_author_pushed_again_after_losing_followers(self):
+        """Автор, потерявший подписчиков, снова раскладывается по лентам."""
+        fan = User.objects.create_user(username='Fan')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=fan, author=self.author)
+        Post.objects.create(text='Пост для всех', author=self.author)
+        Follow.objects.filter(user=fan).delete()
+        self.assertFalse(PulledAuthor.objects.exists())
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.reader, post__text='Пост для всех'
+            ).exists()
+        )
+        Post.objects.create(text='Ещё пост', author=self.author)
+        self.assertEqual(self.feed_texts(), ['Ещё пост', 'Пост для всех'])
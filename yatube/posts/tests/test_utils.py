@@ -0,0 +1,139 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+from posts.utils import KeysetPage, page_window, pagination
+
+
+User = get_user_model()
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='ChosenOne')
+        for i in range(13):
+            Post.objects.create(text=f'Пост {i}', author=cls.user)
+        cls.factory = RequestFactory()
+
+    def get_page(self, query=''):
+        request = self.factory.get('/' + query)
+        return pagination(request, Post.objects.all(), 10, keyset=True)
+
+    def test_pages_follow_each_other(self):
+        """Курсоры after/before листают ленту без пропусков."""
+        first = self.get_page()
+        self.assertIsInstance(first, KeysetPage)
+        self.assertEqual(len(first), 10)
+        self.assertTrue(first.has_next())
+        self.assertFalse(first.has_previous())
+        second = self.get_page(f'?after={first.next_cursor}')
+        self.assertEqual(len(second), 3)
+        self.assertFalse(second.has_next())
+        self.assertTrue(second.has_previous())
+        ids = [post.pk for post in list(first) + list(second)]
+        self.assertEqual(
+            ids, list(Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True
+            ))
+        )
+        back = self.get_page(f'?before={second.previous_cursor}')
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_page_number_still_works(self):
+        """Старые ссылки ?page=N обслуживаются обычным пагинатором."""
+        page = self.get_page('?page=2')
+        self.assertNotIsInstance(page, KeysetPage)
+        self.assertEqual(len(page), 3)
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор возвращает первую страницу."""
+        page = self.get_page('?after=not-a-cursor')
+        self.assertEqual(list(page), list(self.get_page()))
+
+    @override_settings(POSTS_KEYSET_PAGINATION=True)
+    def test_feed_renders_cursor_links(self):
+        """Лента с курсорной пагинацией выводит ссылки ?after=."""
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'ChosenOne'})
+        )
+        page_obj = response.context['page_obj']
+        self.assertContains(response, f'?after={page_obj.next_cursor}')
+        self.assertNotContains(response, '?page=')
+
+
+class ApproximateCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='ChosenOne')
+        for i in range(13):
+            Post.objects.create(text=f'Пост {i}', author=cls.user)
+        cls.factory = RequestFactory()
+
+    def setUp(self):
+        cache.clear()
+
+    def get_page(self, count, query=''):
+        request = self.factory.get('/' + query)
+        return pagination(request, Post.objects.all(), 10, count=count)
+
+    def test_no_count_query(self):
+        """Страница берётся одним запросом, без COUNT(*)."""
+        with self.assertNumQueries(1):
+            page = self.get_page(13, '?page=2')
+        self.assertEqual(len(page), 3)
+        self.assertFalse(page.has_next())
+
+    def test_wrong_estimate_is_corrected(self):
+        """Заниженная оценка не обрывает ленту, завышенная уточняется."""
+        page = self.get_page(5)
+        self.assertTrue(page.has_next())
+        self.assertEqual(page.paginator.num_pages, 2)
+        page = self.get_page(1000, '?page=2')
+        self.assertFalse(page.has_next())
+        self.assertEqual(page.paginator.num_pages, 2)
+        page = self.get_page(1000, '?page=50')
+        self.assertEqual(page.number, 2)
+        self.assertEqual(len(page), 3)
+
+    @override_settings(POSTS_APPROXIMATE_COUNT=True)
+    def test_profile_uses_counter(self):
+        """Профиль берёт число постов из счётчика автора."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('posts:profile', kwargs={'username': 'ChosenOne'})
+            )
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries)
+        )
+
+
+class PageWindowTests(SimpleTestCase):
+    def window(self, number, num_pages=20000):
+        paginator = Paginator(range(num_pages), 1)
+        return page_window(paginator.page(number))
+
+    def test_window_is_bounded(self):
+        """Окно страниц не растёт вместе с их числом."""
+        self.assertEqual(
+            self.window(500), [1, None, 498, 499, 500, 501, 502, None, 20000]
+        )
+        self.assertEqual(self.window(1), [1, 2, 3, None, 20000])
+        self.assertEqual(self.window(20000), [1, None, 19998, 19999, 20000])
+
+    def test_short_gaps_are_not_elided(self):
+        """Пропуск в одну страницу показывается номером, а не многоточием."""
+        self.assertEqual(self.window(4), [1, 2, 3, 4, 5, 6, None, 20000])
+        self.assertEqual(self.window(3, num_pages=5), [1, 2, 3, 4, 5])
@@ -6,7 +6,9 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from posts.models import Comment, Follow, Group, Post
@@ -217,6 +219,14 @@ class PostViewsTests(TestCase):
         self.assertTrue(post_is_edit)
         self.assertEqual(group_list, ['test-slug0', 'test-slug1'])
 
+    def test_post_edit_form_opens_no_transaction(self):
+        """Форма правки не держит транзакцию (блокировку записи SQLite)."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:post_edit', kwargs={'post_id': 1}))
+        self.assertFalse(
+            [query for query in queries if 'SAVEPOINT' in query['sql']]
+        )
+
     def test_post_create_page_show_correct_context(self):
         """Шаблон post_create сформирован с правильным контекстом."""
         response = self.client.get(reverse('posts:post_create'))
@@ -228,3 +238,112 @@ class PostViewsTests(TestCase):
             with self.subTest(value=value):
                 form_field = response.context['form'].fields[value]
                 self.assertIsInstance(form_field, expected)
+
+
+@override_settings(COMMENTS_PER_PAGE=20)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Commentator')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+        for i in range(25):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_comments_loaded_in_pages(self):
+        """Комментарии выводятся страницами, остальные - по курсору."""
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 20)
+        self.assertEqual(comments[0].text, 'Комментарий 24')
+        more_url = reverse(
+            'posts:comments_more', kwargs={'post_id': self.post.pk}
+        )
+        self.assertContains(
+            response, f'{more_url}?after={comments.next_cursor}'
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                more_url, {'after': comments.next_cursor}
+            )
+        rest = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in rest],
+            [f'Комментарий {i}' for i in range(4, -1, -1)],
+        )
+        self.assertNotContains(response, 'Показать ещё')
+
+
+class QueryBudgetTests(TestCase):
+    """Число запросов страниц поста не зависит от числа комментариев."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Blogger')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+        cls.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.pk}
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def add_comments(self, count):
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.author, text=f'Текст {i}')
+            for i in range(count)
+        )
+
+    def test_post_detail_budget(self):
+        """Просмотр поста: сессия, пользователь, теги, пост, комментарии."""
+        for count in (0, 30):
+            with self.subTest(comments=count):
+                self.add_comments(count)
+                cache.clear()
+                with self.assertNumQueries(5):
+                    self.client.get(self.detail_url)
+
+    def test_add_comment_budget(self):
+        """Добавление комментария: проверка поста, вставка, счётчик."""
+        url = reverse('posts:add_comment', kwargs={'post_id': self.post.pk})
+        for count in (0, 30):
+            with self.subTest(comments=count):
+                self.add_comments(count)
+                # Сессия, пользователь, SAVEPOINT транзакции, проверка
+                # поста, INSERT, счётчик комментариев, RELEASE.
+                with self.assertNumQueries(7):
+                    self.client.post(url, {'text': 'Новый комментарий'})
+
+    def test_comment_delete_budget(self):
+        """Удаление комментария не загружает автора и пост."""
+        own = Comment.objects.create(
+            post=self.post, author=self.reader, text='Свой'
+        )
+        other = Comment.objects.create(
+            post=self.post, author=self.author, text='Чужой'
+        )
+        for comment, budget in ((own, 7), (other, 5)):
+            url = reverse(
+                'posts:comment_delete',
+                kwargs={'post_id': self.post.pk, 'comment_id': comment.pk},
+            )
+            with self.subTest(comment=comment.text):
+                with self.assertNumQueries(budget):
+                    self.client.get(url)
+        self.assertFalse(Comment.objects.filter(pk=own.pk).exists())
+        self.assertTrue(Comment.objects.filter(pk=other.pk).exists())
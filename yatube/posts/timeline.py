@@ -0,0 +1,165 @@
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Max, Q
+from django.db.models.query import QuerySet
+
+from .models import Follow, Post, PulledAuthor, TimelineEntry, UserStats
+
+
+def _entry(user_id, post):
+    return TimelineEntry(
+        user_id=user_id,
+        post_id=post.pk,
+        author_id=post.author_id,
+        pub_date=post.pub_date,
+    )
+
+
+def _recent_posts(condition):
+    return (
+        Post.objects.filter(condition)
+        .only('pk', 'author_id', 'pub_date')
+        .order_by('-pub_date')[: settings.TIMELINE_LENGTH]
+    )
+
+
+def trim(user_ids):
+    """Обрезает ленты подписчиков до TIMELINE_LENGTH записей.
+
+    user_ids - список или запрос, выбирающий id подписчиков. Лишние
+    записи всех лент удаляются одним DELETE с оконной функцией.
+    """
+    if isinstance(user_ids, QuerySet):
+        users_sql, params = user_ids.query.sql_with_params()
+    else:
+        if not user_ids:
+            return
+        users_sql = ', '.join(['%s'] * len(user_ids))
+        params = list(user_ids)
+    connection = connections[router.db_for_write(TimelineEntry)]
+    table = connection.ops.quote_name(TimelineEntry._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE id IN ('
+            f'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+            f'PARTITION BY user_id ORDER BY pub_date DESC, id DESC'
+            f') AS position FROM {table} WHERE user_id IN ({users_sql})'
+            f') WHERE position > %s)',
+            [*params, settings.TIMELINE_LENGTH],
+        )
+
+
+def push_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора.
+
+    Посты подтягиваемых авторов не раскладываются: их забирает pull().
+    """
+    if PulledAuthor.objects.filter(author_id=post.author_id).exists():
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        'user_id', flat=True
+    )
+    TimelineEntry.objects.bulk_create(
+        [_entry(user_id, post) for user_id in followers],
+        ignore_conflicts=True,
+    )
+    trim(followers)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты автора."""
+    posts = _recent_posts(Q(author_id=author_id))
+    TimelineEntry.objects.bulk_create(
+        [_entry(user_id, post) for post in posts], ignore_conflicts=True
+    )
+    trim([user_id])
+
+
+def remove_author(user_id, author_id):
+    """Убирает из ленты подписчика посты автора."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def reclassify(author_id):
+    """Переводит автора между раскладкой и подтягиванием.
+
+    Автор с числом подписчиков от TIMELINE_PULL_THRESHOLD подтягивается
+    при чтении. Когда подписчиков становится меньше, посты, вышедшие за
+    время подтягивания, раскладываются по лентам подписчиков.
+    """
+    followers = (
+        UserStats.objects.filter(user_id=author_id)
+        .values_list('followers_count', flat=True)
+        .first()
+        or 0
+    )
+    pulled = PulledAuthor.objects.filter(author_id=author_id).first()
+    if followers >= settings.TIMELINE_PULL_THRESHOLD:
+        if pulled is None:
+            PulledAuthor.objects.create(author_id=author_id)
+        return
+    if pulled is None:
+        return
+    pulled.delete()
+    posts = list(
+        _recent_posts(Q(author_id=author_id, pub_date__gte=pulled.since))
+    )
+    user_ids = Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True
+    )
+    TimelineEntry.objects.bulk_create(
+        [_entry(user_id, post) for user_id in user_ids for post in posts],
+        ignore_conflicts=True,
+    )
+    trim(user_ids)
+
+
+def pull(user):
+    """Подтягивает в ленту читателя новые посты подтягиваемых авторов."""
+    authors = list(
+        Follow.objects.filter(
+            user=user, author__pulled_feed__isnull=False
+        ).values_list('author_id', flat=True)
+    )
+    if not authors:
+        return
+    seen = dict(
+        TimelineEntry.objects.filter(user=user, author_id__in=authors)
+        .values('author_id')
+        .annotate(last=Max('pub_date'))
+        .values_list('author_id', 'last')
+    )
+    floor = None
+    if set(authors) - set(seen):
+        # В заполненной ленте посты старше последней записи всё равно
+        # обрезал бы trim(): их не подтягиваем.
+        floor = (
+            TimelineEntry.objects.filter(user=user)
+            .order_by('-pub_date')
+            .values_list('pub_date', flat=True)[
+                settings.TIMELINE_LENGTH - 1:settings.TIMELINE_LENGTH
+            ]
+            .first()
+        )
+    condition = Q()
+    for author_id in authors:
+        if author_id in seen:
+            condition |= Q(author_id=author_id, pub_date__gt=seen[author_id])
+        elif floor is not None:
+            condition |= Q(author_id=author_id, pub_date__gt=floor)
+        else:
+            condition |= Q(author_id=author_id)
+    # Без новых постов чтение ленты ничего не пишет в базу.
+    posts = list(_recent_posts(condition))
+    if not posts:
+        return
+    TimelineEntry.objects.bulk_create(
+        [_entry(user.pk, post) for post in posts], ignore_conflicts=True
+    )
+    trim([user.pk])
+
+
+def timeline(user):
+    """Лента подписок: записи уже отсортированы по индексу (user, pub_date)."""
+    pull(user)
+    return TimelineEntry.objects.filter(user=user)
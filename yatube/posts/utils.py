@@ -1,7 +1,204 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import json
 
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db.models import Q
 
-def pagination(request, queryset, posts_per_page):
-    paginator = Paginator(queryset, posts_per_page)
+
+class KeysetPage(Page):
+    """Страница, полученная по курсору, без номера и общего количества."""
+
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = ''
+        self.previous_cursor = ''
+        if object_list:
+            self.next_cursor = paginator.encode_cursor(object_list[-1])
+            self.previous_cursor = paginator.encode_cursor(object_list[0])
+
+    def __repr__(self):
+        return '<Keyset page>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+
+class KeysetPaginator(Paginator):
+    """Пагинатор по ключу (pub_date, pk): без OFFSET и без COUNT(*).
+
+    Курсор - непрозрачная строка с значениями ключа крайней записи
+    страницы. Записи упорядочены по убыванию ключа.
+    """
+
+    def __init__(self, object_list, per_page, fields=('pub_date', 'pk')):
+        super().__init__(object_list, per_page)
+        self.fields = fields
+
+    def encode_cursor(self, obj):
+        values = [str(getattr(obj, field)) for field in self.fields]
+        raw = json.dumps(values).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Возвращает значения ключа или None для битого курсора."""
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw.decode())
+            if len(values) != len(self.fields):
+                return None
+            opts = self.object_list.model._meta
+            return [
+                opts.pk.to_python(value)
+                if field == 'pk'
+                else opts.get_field(field).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (
+            binascii.Error,
+            UnicodeDecodeError,
+            ValueError,
+            TypeError,
+            ValidationError,
+        ):
+            return None
+
+    def _seek(self, values, lookup):
+        condition = Q()
+        for i, field in enumerate(self.fields):
+            equal = {f: v for f, v in zip(self.fields[:i], values[:i])}
+            condition |= Q(**equal, **{f'{field}__{lookup}': values[i]})
+        return self.object_list.filter(condition)
+
+    def get_keyset_page(self, after=None, before=None):
+        """Страница после курсора after или перед курсором before."""
+        descending = [f'-{field}' for field in self.fields]
+        before_values = self.decode_cursor(before)
+        if before_values is not None:
+            queryset = self._seek(before_values, 'gt').order_by(*self.fields)
+            rows = list(queryset[: self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[: self.per_page][::-1]
+            return KeysetPage(rows, self, True, has_previous)
+        after_values = self.decode_cursor(after)
+        queryset = self.object_list
+        if after_values is not None:
+            queryset = self._seek(after_values, 'lt')
+        rows = list(queryset.order_by(*descending)[: self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return KeysetPage(
+            rows[: self.per_page], self, has_next, after_values is not None
+        )
+
+
+class ApproximatePaginator(Paginator):
+    """Пагинатор с заранее известным приблизительным числом записей.
+
+    COUNT(*) не выполняется: число берётся из счётчиков или кеша и
+    уточняется по самой странице - неполная страница означает конец
+    ленты, лишняя запись за страницей - что лента продолжается.
+    """
+
+    def __init__(self, object_list, per_page, count):
+        super().__init__(object_list, per_page)
+        self.count = count
+
+    def _set_count(self, count):
+        self.count = count
+        self.__dict__.pop('num_pages', None)
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            number = int(number)
+            if number < 1:
+                raise
+            return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        if len(rows) > self.per_page:
+            self._set_count(max(self.count, bottom + len(rows)))
+        else:
+            self._set_count(bottom + len(rows))
+        return self._get_page(rows[: self.per_page], number, self)
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            # Оценка завышена: точное число нужно, только чтобы найти
+            # последнюю страницу.
+            self._set_count(self.object_list.count())
+            return super().get_page(self.num_pages)
+
+
+def cached_count(queryset, key, timeout):
+    """COUNT(*) по queryset, не чаще раза в timeout секунд."""
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+def page_window(page, on_each_side=2, on_ends=1):
+    """Номера страниц вокруг текущей, первые и последние, с None на
+    месте пропусков: не больше 2 * (on_each_side + on_ends) + 3
+    элементов при любом числе страниц."""
+    num_pages = page.paginator.num_pages
+    left = max(page.number - on_each_side, 1)
+    right = min(page.number + on_each_side, num_pages)
+    window = []
+    if left > on_ends + 2:
+        window.extend(range(1, on_ends + 1))
+        window.append(None)
+    else:
+        left = 1
+    if right < num_pages - on_ends - 1:
+        tail = [None, *range(num_pages - on_ends + 1, num_pages + 1)]
+    else:
+        right, tail = num_pages, []
+    window.extend(range(left, right + 1))
+    window.extend(tail)
+    return window
+
+
+def pagination(
+    request, queryset, posts_per_page, keyset=False, count=None
+):
+    """Страница ленты.
+
+    При keyset=True лента листается курсорами ?after=/?before=,
+    старые ссылки вида ?page=N продолжают работать постранично.
+    count - приблизительное число записей; с ним COUNT(*) не нужен.
+    """
+    if keyset and 'page' not in request.GET:
+        paginator = KeysetPaginator(queryset, posts_per_page)
+        return paginator.get_keyset_page(
+            after=request.GET.get('after'), before=request.GET.get('before')
+        )
+    if count is None:
+        paginator = Paginator(queryset, posts_per_page)
+    else:
+        paginator = ApproximatePaginator(queryset, posts_per_page, count)
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    page = paginator.get_page(page_number)
+    page.page_window = page_window(page)
+    return page
@@ -1,38 +1,81 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.cache import cache
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
+from core.writer import run_write
+
+from .cache import (
+    author_tag,
+    cache_tagged,
+    conditional_tagged,
+    group_tag,
+    index_tag,
+    post_tag,
+)
+from .counters import stats_for
 from .forms import CommentForm, PostForm
 from .models import Comment, Follow, Group, Post, User
-from .utils import pagination
+from .timeline import timeline
+from .utils import KeysetPaginator, cached_count, pagination
 
 
-@cache_page(20, key_prefix='index_page')
+@cache_tagged(settings.FEED_CACHE_TIMEOUT, lambda request: [index_tag()])
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.select_related('group', 'author')
-    page_obj = pagination(request, post_list, settings.POSTS_PER_PAGE)
+    post_list = Post.objects.cards()
+    count = None
+    if settings.POSTS_APPROXIMATE_COUNT:
+        count = cached_count(
+            Post.objects.all(), 'count:index', settings.FEED_CACHE_TIMEOUT
+        )
+    page_obj = pagination(
+        request,
+        post_list,
+        settings.POSTS_PER_PAGE,
+        keyset=settings.POSTS_KEYSET_PAGINATION,
+        count=count,
+    )
     context = {'page_obj': page_obj, 'index': True}
     return render(request, template, context)
 
 
+@cache_tagged(
+    settings.FEED_CACHE_TIMEOUT, lambda request, slug: [group_tag(slug)]
+)
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.group_posts.all()
-    page_obj = pagination(request, post_list, settings.POSTS_PER_PAGE)
+    post_list = group.group_posts.cards()
+    page_obj = pagination(
+        request,
+        post_list,
+        settings.POSTS_PER_PAGE,
+        keyset=settings.POSTS_KEYSET_PAGINATION,
+        count=group.posts_count if settings.POSTS_APPROXIMATE_COUNT else None,
+    )
     context = {'group': group, 'page_obj': page_obj}
     return render(request, template, context)
 
 
+@cache_tagged(
+    settings.FEED_CACHE_TIMEOUT,
+    lambda request, username: [author_tag(username)],
+)
 def profile(request, username):
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    total_posts = author.posts.count()
-    page_obj = pagination(request, post_list, settings.POSTS_PER_PAGE)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    stats = stats_for(author)
+    post_list = author.posts.cards()
+    page_obj = pagination(
+        request,
+        post_list,
+        settings.POSTS_PER_PAGE,
+        keyset=settings.POSTS_KEYSET_PAGINATION,
+        count=stats.posts_count if settings.POSTS_APPROXIMATE_COUNT else None,
+    )
     if request.user.is_authenticated:
         following = Follow.objects.filter(user=request.user, author=author)
     else:
@@ -40,18 +83,39 @@ def profile(request, username):
     context = {
         'author': author,
         'page_obj': page_obj,
-        'total_posts': total_posts,
+        'stats': stats,
+        'total_posts': stats.posts_count,
         'following': following,
     }
     return render(request, template, context)
 
 
+def post_tags(request, post_id):
+    usernames = User.objects.filter(posts=post_id).values_list(
+        'username', flat=True
+    )
+    return [post_tag(post_id), *map(author_tag, usernames)]
+
+
+def comment_page(request, post_id):
+    """Страница комментариев поста, начиная с курсора ?after=."""
+    paginator = KeysetPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        fields=('created', 'pk'),
+    )
+    return paginator.get_keyset_page(after=request.GET.get('after'))
+
+
+@conditional_tagged(post_tags)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = Post.objects.get(pk=post_id)
-    total_posts = Post.objects.filter(author=post.author).count()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    total_posts = stats_for(post.author).posts_count
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = comment_page(request, post_id)
     context = {
         'post': post,
         'total_posts': total_posts,
@@ -61,6 +125,16 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+@conditional_tagged(lambda request, post_id: [post_tag(post_id)])
+def comments_more(request, post_id):
+    template = 'includes/comment_list.html'
+    context = {
+        'post_id': post_id,
+        'comments': comment_page(request, post_id),
+    }
+    return render(request, template, context)
+
+
 @login_required
 def post_create(request):
     template = 'posts/create_post.html'
@@ -69,7 +143,7 @@ def post_create(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        run_write(post.save)
         return redirect('posts:profile', request.user.username)
     context = {'form': form, 'groups': groups}
     return render(request, template, context)
@@ -84,7 +158,7 @@ def post_edit(request, post_id):
         request.POST or None, files=request.FILES or None, instance=post
     )
     if post.author == request.user and form.is_valid():
-        form.save()
+        run_write(form.save)
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
@@ -106,54 +180,66 @@ def post_delete(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def post_delete_confirm(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     if post.author == request.user:
         post.delete()
-    cache.clear()
     return redirect('posts:index')
 
 
 @login_required
 def add_comment(request, post_id):
-    post = Post.objects.get(pk=post_id)
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
-        comment.post = post
-        comment.save()
+        comment.post_id = post_id
+        run_write(comment.save)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@transaction.atomic
 def comment_delete(request, post_id, comment_id):
-    comment = Comment.objects.get(pk=comment_id)
-    if comment.author == request.user:
-        comment.delete()
+    Comment.objects.filter(
+        pk=comment_id, post_id=post_id, author=request.user
+    ).delete()
     return redirect('posts:post_detail', post_id)
 
 
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
-    authors = User.objects.filter(following__in=request.user.follower.all())
-    post_list = Post.objects.filter(author__in=authors)
-    page_obj = pagination(request, post_list, settings.POSTS_PER_PAGE)
+    page_obj = pagination(
+        request,
+        timeline(request.user),
+        settings.POSTS_PER_PAGE,
+        keyset=settings.POSTS_KEYSET_PAGINATION,
+    )
+    post_ids = [entry.post_id for entry in page_obj.object_list]
+    cards = Post.objects.cards().in_bulk(post_ids)
+    page_obj.object_list = [cards[pk] for pk in post_ids if pk in cards]
     context = {'page_obj': page_obj, 'follow': True}
     return render(request, template, context)
 
 
+def _follow(user, author):
+    if not Follow.objects.filter(user=user, author=author).exists():
+        Follow.objects.create(user=user, author=author)
+
+
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    following = Follow.objects.filter(user=request.user, author=author)
-    if author != request.user and not following:
-        Follow.objects.create(user=request.user, author=author)
+    if author != request.user:
+        run_write(_follow, request.user, author)
     return redirect('posts:profile', username)
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     following = Follow.objects.filter(user=request.user, author=author)
@@ -26,10 +26,13 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.profiling.ProfilingMiddleware',
+    'core.middleware.timing.ServerTimingMiddleware',
+    'core.middleware.metrics.MetricsMiddleware',
+    'core.middleware.replicas.PrimaryPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -37,9 +40,13 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'core.middleware.nplusone.NPlusOneMiddleware',
 ]
 
+if DEBUG:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE += ['debug_toolbar.middleware.DebugToolbarMiddleware']
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
@@ -65,11 +72,50 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db_backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
     }
 }
 
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Псевдонимы реплик из DATABASES, с которых запросы читают данные,
+# например копия SQLite, обновляемая manage.py sync_replicas:
+# 'replica': {**DATABASES['default'], 'NAME': ..., 'TEST': {'MIRROR':
+# 'default'}}.
+DATABASE_REPLICAS: list = []
+
+# Сколько секунд после записи моделей этих приложений пользователь
+# читает с основной базы; должно быть больше отставания реплик.
+REPLICA_PIN_SECONDS: int = 10
+
+REPLICA_PIN_APPS: tuple = ('posts', 'auth')
+
+# Эти модели всегда читаются с основной базы: сессия, созданная при
+# входе, нужна уже в следующем запросе.
+PRIMARY_ONLY_APPS: tuple = ('sessions',)
+
+# Применяются к каждому новому соединению с SQLite (core.signals): WAL не
+# даёт записи блокировать чтение лент, busy_timeout - мс ожидания
+# блокировки, cache_size < 0 - размер кеша страниц в КиБ.
+SQLITE_PRAGMAS: dict = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -16000,
+    'mmap_size': 128 * 1024 * 1024,
+}
+
+# Создание постов, комментариев и подписок через один поток-писатель,
+# который фиксирует накопившиеся записи одной транзакцией (core.writer).
+WRITE_QUEUE_ENABLED: bool = False
+
+WRITE_QUEUE_BATCH_SIZE: int = 50
+
+WRITE_QUEUE_TIMEOUT: float = 30.0
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -111,6 +157,16 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 POSTS_PER_PAGE: int = 10
 
+COMMENTS_PER_PAGE: int = 20
+
+POSTS_KEYSET_PAGINATION: bool = False
+
+POSTS_APPROXIMATE_COUNT: bool = False
+
+TIMELINE_LENGTH: int = 1000
+
+TIMELINE_PULL_THRESHOLD: int = 1000
+
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -121,12 +177,50 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+FEED_CACHE_TIMEOUT: int = 60 * 5
+
+POST_CARD_CACHE_TIMEOUT: int = 60 * 60 * 24
+
+# Доля запросов, проверяемых на N+1, и сколько запросов одной формы
+# считаются повтором.
+NPLUSONE_SAMPLE_RATE: float = 0.0
+
+NPLUSONE_THRESHOLD: int = 5
+
+# Замеры SQL, шаблонов и кеша в заголовке Server-Timing и в логе.
+SERVER_TIMING: bool = False
+
+SERVER_TIMING_MODULES: tuple = ('posts.views',)
+
+# Счётчики и гистограммы представлений: каждый процесс пишет свой файл
+# в METRICS_DIR, /metrics/ суммирует их для администраторов.
+METRICS_ENABLED: bool = False
+
+METRICS_DIR: str = os.path.join(BASE_DIR, 'metrics')
+
+# Профили запросов с токеном из manage.py profiles --token.
+PROFILE_DIR: str = os.path.join(BASE_DIR, 'profiles')
+
+PROFILE_TOKEN_MAX_AGE: int = 60 * 60
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.sqlite.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'default.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'MAX_SIZE': 64 * 1024 * 1024,
+        },
     }
 }
 
+if DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]